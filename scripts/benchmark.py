@@ -0,0 +1,185 @@
+"""
+Sweep HNSW parameters and report the recall/latency trade-off.
+Usage:
+    python -m scripts.benchmark \
+        --qrels <dev | eval1 | eval2> \
+        [--m <n> ...] [--ef-construction <n> ...] [--ef-search <n> ...] \
+        [--k <n>] [--target-recall <r>] [--save <filename>]
+"""
+
+import csv
+import json
+import os
+import time
+from argparse import ArgumentParser
+from itertools import product
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from systems.flat import exact_top_k, merge_top_k
+from systems.hnsw import HNSWSystem, M, EF_CONSTRUCTION, EF_SEARCH
+from utils.manifest import manifest_problems
+from utils.loaders import load_qrels, load_h5_embeddings_by_id, iter_h5_embeddings
+from utils.config import (
+    SUBSET_EMBEDDINGS_PATH, QUERIES_EMBEDDINGS_PATH, QRELS_DEV_PATH, QRELS_EVAL1_PATH, QRELS_EVAL2_PATH,
+    BENCHMARKS_DIR, HNSW_SWEEP_DIR,
+)
+
+# Available qrels
+QRELS: Dict[str, str] = {
+    "dev": QRELS_DEV_PATH,
+    "eval1": QRELS_EVAL1_PATH,
+    "eval2": QRELS_EVAL2_PATH,
+}
+
+# Report columns (CSV order)
+COLUMNS: List[str] = [
+    "m", "ef_construction", "ef_search", "recall", "qps", "p50_ms", "p99_ms",
+    "build_s", "index_mb", "disk_mb", "pareto",
+]
+
+def exact_ground_truth(query_embeddings: np.ndarray, top_k: int, chunk_size: int = 100000) -> np.ndarray:
+    """
+    Exact inner-product top-k doc rows for each query, streaming the collection in chunks.
+    """
+    best_scores = np.empty((len(query_embeddings), 0), dtype=np.float32)
+    best_rows = np.empty((len(query_embeddings), 0), dtype=np.int64)
+
+    offset = 0
+    for _, chunk_embeddings in iter_h5_embeddings(SUBSET_EMBEDDINGS_PATH, chunk_size):
+        faiss.normalize_L2(chunk_embeddings)
+        scores, rows = exact_top_k(query_embeddings, chunk_embeddings, top_k, row_offset=offset)
+        best_scores, best_rows = merge_top_k(best_scores, best_rows, scores, rows, top_k)
+        offset += len(chunk_embeddings)
+
+    return best_rows
+
+def load_or_build(m: int, ef_construction: int) -> Dict:
+    """
+    Build (or reuse) the index for one (M, efConstruction) pair and return its build stats.
+    An index is reused only when its manifest matches the current embeddings and parameters.
+    """
+    system = HNSWSystem(m=m, ef_construction=ef_construction)
+    system.build_dir = os.path.join(HNSW_SWEEP_DIR, f"m{m}_efc{ef_construction}")
+    index_path = os.path.join(system.build_dir, "index.faiss")
+    stats_path = os.path.join(system.build_dir, "build.json")
+
+    problems = manifest_problems(
+        system.build_dir, {"embeddings": SUBSET_EMBEDDINGS_PATH}, system.build_params(), system.artifact_paths()
+    )
+    if not problems and os.path.exists(stats_path):
+        print(f"[Benchmark] Reusing index M={m}, efConstruction={ef_construction}")
+        system.load()
+        with open(stats_path, "r", encoding="utf-8") as stats_file:
+            stats = json.load(stats_file)
+    else:
+        if os.path.exists(index_path): print(f"[Benchmark] Stale index ({'; '.join(problems) or 'no build.json'})")
+        print(f"[Benchmark] Building index M={m}, efConstruction={ef_construction}")
+        start_time = time.perf_counter()
+        system.build(force=True) # build.json is missing, so time a full build
+        stats = {"build_s": time.perf_counter() - start_time}
+        with open(stats_path, "w", encoding="utf-8") as stats_file:
+            json.dump(stats, stats_file)
+
+    stats["index_mb"] = sum(system.structure_bytes().values()) / (1024 ** 2) # resident graph, vectors and doc IDs
+    stats["disk_mb"] = os.path.getsize(index_path) / (1024 ** 2)
+    stats["index"] = system.index
+    return stats
+
+def measure(index: faiss.Index, query_embeddings: np.ndarray, ground_truth: np.ndarray, top_k: int) -> Dict[str, float]:
+    """Measure recall@k, batched QPS and single-query latency percentiles at the current efSearch."""
+    # Throughput: one batched call, as HNSWSystem.search issues it
+    start_time = time.perf_counter()
+    _, indices = index.search(query_embeddings, top_k)
+    elapsed = time.perf_counter() - start_time
+
+    # Latency: one query at a time
+    latencies = np.empty(len(query_embeddings))
+    for row in range(len(query_embeddings)):
+        query_start = time.perf_counter()
+        index.search(query_embeddings[row:row + 1], top_k)
+        latencies[row] = time.perf_counter() - query_start
+
+    hits = [len(np.intersect1d(indices[row], ground_truth[row])) for row in range(len(indices))]
+    return {
+        "recall": sum(hits) / (top_k * len(indices)),
+        "qps": len(query_embeddings) / max(elapsed, 1e-9),
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1000,
+    }
+
+def mark_pareto(rows: List[Dict]) -> None:
+    """Flag rows not dominated on (higher recall, higher QPS)."""
+    for row in rows:
+        row["pareto"] = not any(
+            other["recall"] >= row["recall"] and other["qps"] >= row["qps"]
+            and (other["recall"] > row["recall"] or other["qps"] > row["qps"])
+            for other in rows
+        )
+
+def main() -> None:
+    # Parse command line arguments
+    parser = ArgumentParser(description="Sweep HNSW parameters for recall/latency trade-offs.")
+    parser.add_argument("--qrels", choices=list(QRELS.keys()), default="dev")
+    parser.add_argument("--m", type=int, nargs="+", default=[M])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[EF_CONSTRUCTION])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[EF_SEARCH])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--target-recall", type=float, required=False)
+    parser.add_argument("--save", default="hnsw_sweep.csv")
+    args = parser.parse_args()
+
+    # Load and normalize query embeddings for the qrels queries
+    query_ids = list(load_qrels(QRELS[args.qrels]).keys())
+    _, query_embeddings = load_h5_embeddings_by_id(QUERIES_EMBEDDINGS_PATH, query_ids)
+    faiss.normalize_L2(query_embeddings)
+    print(f"[Benchmark] {len(query_embeddings)} queries, k={args.k}")
+
+    print("[Benchmark] Computing exact ground truth...")
+    ground_truth = exact_ground_truth(query_embeddings, args.k)
+
+    rows: List[Dict] = []
+    for m, ef_construction in product(args.m, args.ef_construction):
+        stats = load_or_build(m, ef_construction)
+        index = stats.pop("index")
+        for ef_search in args.ef_search:
+            index.hnsw.efSearch = ef_search
+            row = {"m": m, "ef_construction": ef_construction, "ef_search": ef_search, **stats}
+            row.update(measure(index, query_embeddings, ground_truth, args.k))
+            rows.append(row)
+    mark_pareto(rows)
+
+    # Print table (frontier rows marked with *)
+    print(f"\n{'M':>4} {'efC':>5} {'efS':>5} {'Recall':>7} {'QPS':>9} {'p50ms':>7} {'p99ms':>7} {'Build s':>8} {'Mem MB':>8} {'Disk MB':>8}")
+    for row in sorted(rows, key=lambda r: -r["qps"]):
+        print(
+            f"{row['m']:>4} {row['ef_construction']:>5} {row['ef_search']:>5} {row['recall']:>7.4f} "
+            f"{row['qps']:>9.1f} {row['p50_ms']:>7.3f} {row['p99_ms']:>7.3f} {row['build_s']:>8.1f} "
+            f"{row['index_mb']:>8.1f} {row['disk_mb']:>8.1f}{' *' if row['pareto'] else ''}"
+        )
+
+    # Cheapest frontier point that meets the recall target
+    if args.target_recall is not None:
+        passing = [row for row in rows if row["pareto"] and row["recall"] >= args.target_recall]
+        if passing:
+            best = max(passing, key=lambda r: r["qps"])
+            print(
+                f"\n[Benchmark] Fastest point with recall@{args.k} >= {args.target_recall}: "
+                f"M={best['m']}, efConstruction={best['ef_construction']}, efSearch={best['ef_search']}"
+            )
+        else:
+            print(f"\n[Benchmark] No configuration reaches recall@{args.k} >= {args.target_recall}")
+
+    # Save CSV
+    os.makedirs(BENCHMARKS_DIR, exist_ok=True)
+    output_path = os.path.join(BENCHMARKS_DIR, args.save)
+    with open(output_path, "w", encoding="utf-8", newline="") as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"[Benchmark] Saved results to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -2,40 +2,38 @@
 Build search system indices.
 Usage:
     python -m scripts.build \
-        --system <bm25 | hnsw | rerank> \
-        [--track <time | memory>]
+        --system <bm25 | hnsw | hnsw-sq | hnsw-pq | ivf-pq | hnsw-sharded | flat | hybrid | rerank-rrf | rerank-lsf | rerank-dense> \
+        [--track <time | memory | rss>] [--profile] [--profile-startup] [--force] \
+        [dense options, see scripts/options.py]
 """
 
 from argparse import ArgumentParser
-from typing import Dict, Type
 
-from systems.bm25 import BM25System
-from systems.hnsw import HNSWSystem
-from systems.rerank_rrf import RecipricalRankFusion
-from systems.rerank_linear import LinearScoreFusion
-from utils.performance import track_performance
-
-# Available systems
-SYSTEMS: Dict[str, Type] = {
-    "bm25": BM25System,
-    "hnsw": HNSWSystem,
-    "rerank-rrf": RecipricalRankFusion,
-    "rerank-lsf": LinearScoreFusion,
-}
+from systems.registry import SYSTEMS, load_system_class
+from utils.performance import track_performance, StartupProfile
+from scripts.options import add_system_arguments, init_system
 
 def main() -> None:
     # Parse command line arguments
     parser = ArgumentParser(description="Build search system indices.")
     parser.add_argument("--system", choices=list(SYSTEMS.keys()), required=True)
-    parser.add_argument("--track", choices=["time", "memory"], required=False)
+    parser.add_argument("--track", choices=["time", "memory", "rss"], required=False)
+    parser.add_argument("--profile", action="store_true") # cProfile each stage (overrides --track)
+    parser.add_argument("--profile-startup", action="store_true")
+    parser.add_argument("--force", action="store_true") # rebuild even if the manifest matches
+    add_system_arguments(parser)
     args = parser.parse_args()
+    startup = StartupProfile()
 
-    # Initialize system
-    system_cls = SYSTEMS[args.system]
-    system = system_cls()
+    # Initialize system (its module, and heavy dependencies, are imported only now)
+    system_cls = load_system_class(args.system)
+    startup.mark("import system")
+    system = init_system(system_cls, args)
+    startup.mark("init system")
+    if args.profile_startup: startup.report()
     
-    # Build (optionally track time or memory)
-    track_performance(system.build, track=args.track)
+    # Build (optionally track time or memory); current artifacts are reused unless --force
+    track_performance(system.build, force=args.force, track="profile" if args.profile else args.track, label=args.system)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
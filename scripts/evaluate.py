@@ -2,9 +2,11 @@
 Evaluate search system results on MS MARCO datasets using pytrec_eval.
 Usage:
     python -m scripts.evaluate \
-        --system <bm25 | hnsw | rerank> \
+        --system <bm25 | hnsw | hnsw-sq | hnsw-pq | ivf-pq | hnsw-sharded | flat | hybrid | rerank-rrf | rerank-lsf | rerank-dense> \
         --qrels <dev | eval1 | eval2> \
         --run <filename>
+
+--system accepts any name registered in systems/registry.py; the run is read from runs/<system>/<filename>.
 """
 
 import os
@@ -13,11 +15,12 @@ from typing import Dict, List
 
 from pytrec_eval import RelevanceEvaluator
 
-from utils.loaders import load_qrels, load_run
+from systems.registry import SYSTEMS as REGISTERED_SYSTEMS
+from utils.loaders import load_qrels_cached, load_run
 from utils.config import RUNS_DIR, QRELS_DEV_PATH, QRELS_EVAL1_PATH, QRELS_EVAL2_PATH
 
 # Available systems
-SYSTEMS: List[str] = ["bm25", "hnsw", "rerank-rrf", "rerank-lsf"]
+SYSTEMS: List[str] = list(REGISTERED_SYSTEMS)
 
 # Available qrels
 QRELS: Dict[str, str] = {
@@ -69,7 +72,7 @@ def main() -> None:
 
     # Load data
     run = load_run(run_path)
-    qrels = load_qrels(qrels_path)
+    qrels = load_qrels_cached(qrels_path)
 
     # Evaluate (binary for dev, graded for eval)
     is_binary = args.qrels == "dev"
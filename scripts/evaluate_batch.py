@@ -0,0 +1,139 @@
+"""
+Evaluate many runs against one or more qrels sets in a single pass.
+Usage:
+    python -m scripts.evaluate_batch \
+        --runs <system>/<filename | glob> ... \
+        --qrels <dev | eval1 | eval2> ... \
+        [--workers <n>] [--save <filename>]
+
+Example:
+    python -m scripts.evaluate_batch --runs "*/*_dev.tsv" "hybrid/*.npz" --qrels dev eval1 eval2
+"""
+
+import csv
+import glob
+import os
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+from pytrec_eval import RelevanceEvaluator
+
+from scripts.evaluate import METRICS, QRELS
+from utils.loaders import load_qrels_cached, load_run
+from utils.config import RUNS_DIR, EVALUATIONS_DIR
+
+# Evaluation parameters
+NUM_WORKERS: int = os.cpu_count() or 1  # Evaluation processes
+
+# Per-process state for worker processes (set by _init_worker)
+_WORKER_QRELS: Dict[str, Dict[str, Dict[str, int]]] = {}
+_WORKER_EVALUATORS: Dict[str, RelevanceEvaluator] = {}
+
+def _init_worker(qrels_paths: Dict[str, str]) -> None:
+    """Load every requested qrels set once per worker (from the binary cache after the first parse)."""
+    for name, path in qrels_paths.items():
+        _WORKER_QRELS[name] = load_qrels_cached(path)
+
+def _evaluate_task(task: Tuple[str, str]) -> Tuple[str, str, np.ndarray, np.ndarray, float]:
+    """
+    Evaluate one (run_path, qrels_name) pair in a worker.
+
+    Returns:
+        (run_path, qrels_name, query_ids, values, seconds), where values has
+        one row per query and one column per METRICS entry (NaN if not computed).
+    """
+    run_path, qrels_name = task
+    start_time = time.perf_counter()
+
+    # Evaluators are built lazily and reused for every run this worker scores against the same qrels
+    if qrels_name not in _WORKER_EVALUATORS:
+        _WORKER_EVALUATORS[qrels_name] = RelevanceEvaluator(_WORKER_QRELS[qrels_name], METRICS.values())
+
+    run = load_run(run_path)
+    results = _WORKER_EVALUATORS[qrels_name].evaluate(run)
+
+    query_ids = np.array(sorted(results), dtype=str)
+    values = np.array(
+        [[results[query_id].get(key, np.nan) for key in METRICS.values()] for query_id in query_ids],
+        dtype=np.float64,
+    ).reshape(len(query_ids), len(METRICS))
+
+    return run_path, qrels_name, query_ids, values, time.perf_counter() - start_time
+
+def resolve_runs(patterns: List[str]) -> List[str]:
+    """Expand `<system>/<filename | glob>` patterns under runs/ (sorted, deduplicated)."""
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.join(RUNS_DIR, pattern)))
+        if not matches: print(f"[Evaluate] No runs match {pattern}")
+        paths.extend(
+            path for path in matches
+            if not path.endswith((".json", ".csv")) # stats and benchmark outputs
+            and os.path.commonpath([path, EVALUATIONS_DIR]) != EVALUATIONS_DIR
+        )
+
+    return list(dict.fromkeys(paths))
+
+def main() -> None:
+    # Parse command line arguments
+    parser = ArgumentParser(description="Evaluate many runs against many qrels sets using pytrec_eval.")
+    parser.add_argument("--runs", nargs="+", required=True)
+    parser.add_argument("--qrels", choices=list(QRELS.keys()), nargs="+", required=True)
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--save", default="summary.csv")
+    args = parser.parse_args()
+
+    run_paths = resolve_runs(args.runs)
+    if not run_paths: raise ValueError("No run files to evaluate.")
+
+    # Parse each qrels file once here so workers only read the binary cache
+    qrels_paths = {name: QRELS[name] for name in args.qrels}
+    for path in qrels_paths.values(): load_qrels_cached(path)
+
+    tasks = [(run_path, qrels_name) for run_path in run_paths for qrels_name in args.qrels]
+    num_workers = max(1, min(args.workers, len(tasks)))
+    print(f"[Evaluate] {len(run_paths)} runs x {len(args.qrels)} qrels on {num_workers} workers")
+
+    os.makedirs(EVALUATIONS_DIR, exist_ok=True)
+    rows: List[Dict] = []
+    with ProcessPoolExecutor(num_workers, initializer=_init_worker, initargs=(qrels_paths,)) as executor:
+        for run_path, qrels_name, query_ids, values, seconds in executor.map(_evaluate_task, tasks):
+            run_name = os.path.relpath(run_path, RUNS_DIR)
+            if not len(query_ids):
+                print(f"[Evaluate] Skipping {run_name} on {qrels_name}: no queries in common")
+                continue
+
+            # Per-query metrics as arrays, one file per (run, qrels)
+            per_query_path = os.path.join(EVALUATIONS_DIR, f"{run_name.replace(os.sep, '__')}.{qrels_name}.npz")
+            np.savez(per_query_path, query_ids=query_ids, metrics=np.array(list(METRICS), dtype=str), values=values)
+
+            # Skip NDCG for binary qrels and MAP for graded qrels (as scripts.evaluate does)
+            means = np.nanmean(values, axis=0)
+            row = {"run": run_name, "qrels": qrels_name, "queries": len(query_ids), "seconds": seconds}
+            for label, key, mean in zip(METRICS, METRICS.values(), means):
+                skipped = (qrels_name == "dev" and key.startswith("ndcg")) or (qrels_name != "dev" and key == "map")
+                row[label] = None if skipped else float(mean)
+            rows.append(row)
+
+    # Print comparison table
+    width = max([len(row["run"]) for row in rows] + [3])
+    print(f"\n{'Run':<{width}} {'Qrels':<6} {'Queries':>7} " + " ".join(f"{label:>10}" for label in METRICS))
+    for row in rows:
+        print(
+            f"{row['run']:<{width}} {row['qrels']:<6} {row['queries']:>7} "
+            + " ".join(f"{'-':>10}" if row[label] is None else f"{row[label]:>10.4f}" for label in METRICS)
+        )
+
+    # Save CSV
+    output_path = os.path.join(EVALUATIONS_DIR, args.save)
+    with open(output_path, "w", encoding="utf-8", newline="") as output_file:
+        writer = csv.DictWriter(output_file, fieldnames=["run", "qrels", "queries", *METRICS, "seconds"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n[Evaluate] Saved summary to {output_path} and per-query metrics to {EVALUATIONS_DIR}/")
+
+if __name__ == "__main__":
+    main()
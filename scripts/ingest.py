@@ -0,0 +1,58 @@
+"""
+Add new passages to built indexes without a full rebuild.
+Usage:
+    python -m scripts.ingest \
+        --system <bm25 | hnsw | hnsw-sq | hnsw-pq | ivf-pq | hnsw-sharded | hybrid> \
+        [--passages <tsv>] [--embeddings <h5>] \
+        [--merge-threshold <n>] [--merge] \
+        [--track <time | memory | rss>] [system options, see scripts/options.py]
+
+Examples:
+    python -m scripts.ingest --system hybrid --passages new.tsv --embeddings new.h5
+    python -m scripts.ingest --system bm25 --merge
+"""
+
+import inspect
+from argparse import ArgumentParser
+
+from systems.registry import load_system_class
+from systems.bm25_delta import MERGE_THRESHOLD
+from utils.performance import track_performance
+from scripts.options import add_system_arguments, init_system
+
+# Systems with an incremental ingest path
+INGEST_SYSTEMS = ["bm25", "hnsw", "hnsw-sq", "hnsw-pq", "ivf-pq", "hnsw-sharded", "hybrid"]
+
+def main() -> None:
+    # Parse command line arguments
+    parser = ArgumentParser(description="Add new passages to built indexes.")
+    parser.add_argument("--system", choices=INGEST_SYSTEMS, required=True)
+    parser.add_argument("--passages", dest="passages_path", required=False)      # TSV of new passages (BM25)
+    parser.add_argument("--embeddings", dest="embeddings_path", required=False)  # HDF5 of new embeddings (HNSW)
+    parser.add_argument("--merge-threshold", type=int, default=MERGE_THRESHOLD)  # BM25 delta size that starts a merge
+    parser.add_argument("--merge", action="store_true")                          # merge the BM25 delta now, in this process
+    parser.add_argument("--track", choices=["time", "memory", "rss"], required=False)
+    add_system_arguments(parser)
+    args = parser.parse_args()
+
+    system = init_system(load_system_class(args.system), args)
+
+    if args.merge:
+        if args.system != "bm25": raise ValueError("--merge applies to the bm25 delta segment only.")
+        track_performance(system.merge, track=args.track)
+        return
+
+    # Pass the inputs this system's ingest() takes, and require each of them
+    accepted = inspect.signature(system.ingest).parameters
+    inputs = {
+        name: getattr(args, name)
+        for name in ("passages_path", "embeddings_path", "merge_threshold")
+        if name in accepted
+    }
+    missing = [f"--{name.split('_')[0]}" for name in ("passages_path", "embeddings_path") if name in inputs and inputs[name] is None]
+    if missing: raise ValueError(f"{args.system} ingest requires {' and '.join(missing)}.")
+
+    track_performance(system.ingest, **inputs, track=args.track)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Shared command line options for system construction.
+"""
+
+import inspect
+from argparse import ArgumentParser, Namespace
+from typing import Type
+
+from utils.cache import RESULT_CACHE_MB
+
+def add_system_arguments(parser: ArgumentParser) -> None:
+    """Add optional system parameters (unset options keep each system's defaults)."""
+    # BM25 query execution
+    parser.add_argument("--workers", dest="num_workers", type=int, required=False)  # BM25 query / parse, shard build processes
+    parser.add_argument("--list-cache-mb", type=int, required=False)                 # BM25 posting list cache budget
+    parser.add_argument("--list-cache-policy", choices=["lru", "lfu"], required=False)
+
+    # Dense index parameters (HNSW variants)
+    parser.add_argument("--m", type=int, required=False)                # HNSW graph degree
+    parser.add_argument("--ef-construction", type=int, required=False)  # HNSW build-time beam width
+    parser.add_argument("--ef-search", type=int, required=False)        # HNSW search-time beam width (widest beam when adaptive)
+    parser.add_argument("--ef-min", type=int, required=False)           # adaptive search: starting beam width per query
+    parser.add_argument("--latency-budget-ms", type=float, required=False)  # adaptive search: per-query budget for widening
+
+    # Sharding parameters (HNSW-Sharded)
+    parser.add_argument("--shards", dest="num_shards", type=int, required=False)   # row-range shards
+    parser.add_argument("--shard-ids", type=int, nargs="+", required=False)        # shards this process builds/loads
+
+    # Quantization parameters (HNSW-SQ, HNSW-PQ, IVF-PQ)
+    parser.add_argument("--sq-type", required=False)                    # e.g. SQ8, SQ4, SQfp16
+    parser.add_argument("--pq-m", type=int, required=False)             # PQ sub-vectors per embedding
+    parser.add_argument("--pq-nbits", type=int, required=False)         # bits per PQ code
+    parser.add_argument("--nlist", type=int, required=False)            # IVF coarse clusters
+    parser.add_argument("--nprobe", type=int, required=False)           # IVF clusters visited per query
+
+    # Fusion parameters (hybrid, rerankers)
+    parser.add_argument("--fusion", choices=["rrf", "linear"], required=False)
+    parser.add_argument("--rrf-k", type=int, required=False)            # RRF rank smoothing constant
+    parser.add_argument("--alpha", type=float, required=False)          # linear fusion weight on BM25
+    parser.add_argument("--candidates", type=int, required=False)       # results per leg before fusion
+
+    # Dense query execution
+    parser.add_argument("--batch-size", type=int, required=False)       # queries per FAISS call / matmul block
+    parser.add_argument("--doc-block-size", type=int, required=False)   # documents per matmul block (flat)
+    parser.add_argument("--threads", dest="num_threads", type=int, required=False)  # FAISS OpenMP threads
+
+    # Persistent result cache (bm25, HNSW variants, hybrid legs); bare --cache uses the default budget
+    parser.add_argument("--cache", dest="result_cache_mb", type=int, nargs="?", const=RESULT_CACHE_MB)  # MB on disk
+
+def init_system(system_cls: Type, args: Namespace):
+    """Construct a system, passing only the options its constructor accepts."""
+    accepted = inspect.signature(system_cls.__init__).parameters
+    kwargs = {
+        name: value
+        for name, value in vars(args).items()
+        if name in accepted and name != "self" and value is not None
+    }
+    return system_cls(**kwargs)
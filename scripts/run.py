@@ -2,31 +2,32 @@
 Run search systems on MS MARCO queries.
 Usage:
     python -m scripts.run \
-        --system <bm25 | hnsw | rerank> \
-        --qrels <dev | eval1 | eval2> \
+        --system <bm25 | hnsw | hnsw-sq | hnsw-pq | ivf-pq | hnsw-sharded | flat | hybrid | rerank-rrf | rerank-lsf | rerank-dense> ... \
+        --qrels <dev | eval1 | eval2> ... \
         --save <filename> \
-        [--track <time | memory>]
+        [--track <time | memory | rss | latency>] [--profile] [--profile-startup] \
+        [dense options, see scripts/options.py]
+
+Several --system and --qrels values run in one invocation: each system loads its
+index once and searches the union of the targets' queries once, then one run
+file is written per target (see target_filename).
+
+Example:
+    python -m scripts.run --system bm25 hnsw --qrels dev eval1 eval2 --save "{system}_{qrels}.tsv"
 """
 
 import os
 from argparse import ArgumentParser
-from typing import Dict, List, Tuple, Type
+from typing import Dict, List, Tuple
 
-from systems.bm25 import BM25System
-from systems.hnsw import HNSWSystem
-from systems.rerank_rrf import RecipricalRankFusion
-from systems.rerank_linear import LinearScoreFusion
+from systems.registry import SYSTEMS, load_system_class
 from utils.loaders import load_queries, load_qrels
-from utils.performance import track_performance
+from utils.performance import track_performance, StartupProfile
+from scripts.options import add_system_arguments, init_system
 from utils.config import QUERIES_DEV_PATH, QUERIES_EVAL_PATH, QRELS_DEV_PATH, QRELS_EVAL1_PATH, QRELS_EVAL2_PATH, RUNS_BM25_DIR, RUNS_HNSW_DIR
 
-# Available systems
-SYSTEMS: Dict[str, Type] = {
-    "bm25": BM25System,
-    "hnsw": HNSWSystem,
-    "rerank-rrf": RecipricalRankFusion,
-    "rerank-lsf": LinearScoreFusion,
-}
+# Systems searched from query text (others fuse existing run files)
+RETRIEVAL_SYSTEMS: List[str] = ["bm25", "hnsw", "hnsw-sq", "hnsw-pq", "ivf-pq", "hnsw-sharded", "flat", "hybrid", "rerank-dense"]
 
 # Qrels datasets mapping
 DATASETS: Dict[str, Dict[str, str]] = {
@@ -35,44 +36,95 @@ DATASETS: Dict[str, Dict[str, str]] = {
     "eval2": {"qrels": QRELS_EVAL2_PATH, "queries": QUERIES_EVAL_PATH},
 }
 
+def target_filename(save: str, system: str, qrels: str, multiple_targets: bool) -> str:
+    """
+    Run filename for one (system, qrels) target: `{system}` and `{qrels}` in `save`
+    are substituted, and with several targets and no `{qrels}`, `_<qrels>` is
+    appended before the extension (e.g. run.tsv -> run_eval1.tsv).
+    """
+    filename = save.replace("{system}", system)
+    if "{qrels}" in filename: return filename.replace("{qrels}", qrels)
+    if not multiple_targets: return filename
+
+    root, ext = os.path.splitext(filename)
+    return f"{root}_{qrels}{ext}"
+
+def load_targets(targets: List[str]) -> Tuple[List[Tuple[str, str]], Dict[str, List[str]]]:
+    """
+    Load each target's qrels and each distinct queries file once.
+
+    Returns:
+        The union of the targets' (query_id, query_text) pairs, each query once,
+        and target -> its query IDs (qrels queries that have text).
+    """
+    queries_by_path: Dict[str, Dict[str, str]] = {}
+    target_query_ids: Dict[str, List[str]] = {}
+    union: Dict[str, str] = {}
+    for target in targets:
+        dataset: Dict[str, str] = DATASETS[target]
+        if dataset["queries"] not in queries_by_path: queries_by_path[dataset["queries"]] = load_queries(dataset["queries"])
+        queries_dataset = queries_by_path[dataset["queries"]]
+
+        # Filter for qrels queries
+        query_ids = [query_id for query_id in load_qrels(dataset["qrels"]) if query_id in queries_dataset]
+        target_query_ids[target] = query_ids
+        for query_id in query_ids: union.setdefault(query_id, queries_dataset[query_id])
+
+    return list(union.items()), target_query_ids
+
+def run_targets(system, queries: List[Tuple[str, str]], target_query_ids: Dict[str, List[str]], filenames: Dict[str, str]) -> None:
+    """Search every unique query once and write each target's run from the shared results."""
+    requested = sum(len(query_ids) for query_ids in target_query_ids.values())
+    print(f"[run.py] {system.name}: searching {len(queries)} unique queries for {len(target_query_ids)} targets ({requested} requested)")
+    results = dict(system.iter_search(queries, top_k=100))
+
+    for target, query_ids in target_query_ids.items():
+        system.save_run([(query_id, results[query_id]) for query_id in query_ids if query_id in results], filenames[target])
+
 def main() -> None:
     # Parse command line arguments
     parser = ArgumentParser(description="Run search systems on MS MARCO queries.")
-    parser.add_argument("--system", choices=list(SYSTEMS.keys()), required=True)
-    parser.add_argument("--qrels", choices=list(DATASETS.keys()))
+    parser.add_argument("--system", nargs="+", choices=list(SYSTEMS.keys()), required=True)
+    parser.add_argument("--qrels", nargs="+", choices=list(DATASETS.keys()))
     parser.add_argument("--targets", nargs="+")
     parser.add_argument("--save", required=True)
-    parser.add_argument("--track", choices=["time", "memory"], required=False)
+    parser.add_argument("--track", choices=["time", "memory", "rss", "latency"], required=False)
+    parser.add_argument("--profile", action="store_true") # cProfile each stage (overrides --track)
+    parser.add_argument("--profile-startup", action="store_true")
+    add_system_arguments(parser)
     args = parser.parse_args()
+    track = "profile" if args.profile else args.track
+    startup = StartupProfile()
 
-    # Initialize system
-    system_cls = SYSTEMS[args.system]
-    system = system_cls()
-
-    if args.system in ["bm25", "hnsw"]:
-        # Resolve dataset paths
-        dataset: Dict[str, str] = DATASETS[args.qrels]
-        qrels_path: str = dataset["qrels"]
-        query_path: str = dataset["queries"]
+    if all(name in RETRIEVAL_SYSTEMS for name in args.system):
+        if not args.qrels: raise ValueError("Retrieval systems require --qrels.")
+        queries, target_query_ids = load_targets(list(dict.fromkeys(args.qrels)))
+        multiple_targets = len(target_query_ids) > 1
 
-        # Load query IDs and queries dataset
-        query_ids: set[str] = set(load_qrels(qrels_path).keys())
-        queries_dataset: Dict[str, str] = load_queries(query_path)
+        for position, name in enumerate(dict.fromkeys(args.system)):
+            # Initialize system (its module, and heavy dependencies, are imported only now)
+            system_cls = load_system_class(name)
+            if position == 0: startup.mark("import system")
+            system = init_system(system_cls, args)
+            if position == 0: startup.mark("init system")
+            if args.profile_startup and position == 0: startup.report() # later systems start after earlier searches
 
-        # Filter for qrels queries
-        queries: List[Tuple[str, str]] = [
-            (query_id, queries_dataset[query_id]) # (query_id, query_text)
-            for query_id in query_ids
-            if query_id in queries_dataset
-        ]
-
-        # Run retrieval (optionally track time or memory)
-        results: List = track_performance(system.search, queries, top_k=100, track=args.track)
+            # Run retrieval (optionally track time or memory); with one target, results
+            # stream from search straight into the run file instead of being collected first
+            filenames = {target: target_filename(args.save, name, target, multiple_targets) for target in target_query_ids}
+            if multiple_targets:
+                track_performance(run_targets, system, queries, target_query_ids, filenames, track=track, label=name)
+            else:
+                results = system.iter_search(queries, top_k=100)
+                track_performance(system.save_run, results, filenames[args.qrels[0]], track=track, label=name)
 
-        # Save results
-        if args.save: system.save_run(results, args.save)
+    elif len(args.system) == 1 and args.system[0] in ["rerank-rrf", "rerank-lsf"]:
+        system_cls = load_system_class(args.system[0])
+        startup.mark("import system")
+        system = init_system(system_cls, args)
+        startup.mark("init system")
+        if args.profile_startup: startup.report()
 
-    elif args.system in  ["rerank-rrf", "rerank-lsf"]:
         if not args.targets or len(args.targets) != 2:
             raise ValueError("Rerank system requires two target eval filenames (BM25 and HNSW).")
         
@@ -82,17 +134,16 @@ def main() -> None:
 
         print(f"[run.py] Using BM25 run: {bm25_path}")
         print(f"[run.py] Using HNSW run: {hnsw_path}")
-        # Run re-ranking
-        results: List = track_performance(
-            system.search,
-            bm25_filename=args.targets[0] if args.targets else "bm25_eval1.tsv",
-            hnsw_filename=args.targets[1] if args.targets else "hnsw_eval1.tsv",
-            top_k=100,
-            track=args.track
-        )
-
-        # Save results
-        if args.save: system.save_run(results, args.save)
+        # Run re-ranking and save results (tracked together, so --profile covers the save stage)
+        def rerank() -> List:
+            results: List = system.search(bm25_filename=bm25_filename, hnsw_filename=hnsw_filename, top_k=100)
+            if args.save: system.save_run(results, args.save)
+            return results
+
+        track_performance(rerank, track=track, label=args.system[0])
+
+    else:
+        raise ValueError("rerank-rrf and rerank-lsf fuse existing runs and must be run on their own.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
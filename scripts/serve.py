@@ -0,0 +1,318 @@
+"""
+Serve BM25, HNSW and hybrid search over HTTP from indexes loaded once.
+Usage:
+    python -m scripts.serve \
+        [--host <host>] [--port <n>] \
+        [--max-batch-size <n>] [--max-wait-ms <ms>] \
+        [system options, see scripts/options.py]
+
+Endpoints:
+    POST /search    {"system": "bm25 | hnsw | hybrid", "query_id": "<id>", "query": "<text>", "top_k": <n>}
+    GET  /search    same fields as URL parameters
+    GET  /metrics   queue depth, batch sizes and latency percentiles
+    GET  /health
+"""
+
+import asyncio
+import json
+import time
+from argparse import ArgumentParser
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import faiss
+import numpy as np
+
+from systems.hnsw import HNSWSystem
+from systems.hybrid import HybridSystem
+from utils.loaders import load_h5_id_index, load_h5_embeddings_by_id
+from scripts.options import add_system_arguments, init_system
+from utils.config import QUERIES_EMBEDDINGS_PATH
+
+# Server parameters
+HOST: str = "127.0.0.1"         # Bind address (localhost only by default)
+PORT: int = 8000                # Listen port
+MAX_BATCH_SIZE: int = 64        # Dense requests gathered into one FAISS call
+MAX_WAIT_MS: float = 2.0        # Longest a dense request waits for its batch to fill
+LATENCY_WINDOW: int = 10000     # Recent requests kept per system for latency percentiles
+DEFAULT_TOP_K: int = 10         # Results returned when a request omits top_k
+MAX_TOP_K: int = 1000           # Largest top_k accepted (a dense batch searches at its largest top_k)
+
+# HTTP status reasons used by the server
+REASONS: Dict[int, str] = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+# Types
+RankedResults = List[Tuple[int | str, float]]
+
+class RequestError(Exception):
+    """A request the server rejects with the given HTTP status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+def parse_top_k(value: object) -> int:
+    """
+    Validate top_k (a JSON integer, or digits from URL parameters) before the request
+    is queued: one bad value would otherwise fail or bloat its whole dense batch.
+    """
+    if isinstance(value, str) and value.strip().isdigit(): value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_TOP_K:
+        raise RequestError(400, f"top_k must be an integer in 1..{MAX_TOP_K}")
+    return value
+
+class Metrics:
+    """Request counts, dense queue depth, batch sizes and rolling latency windows."""
+
+    def __init__(self) -> None:
+        self.start_time = time.perf_counter()
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.batch_sizes: Deque[int] = deque(maxlen=LATENCY_WINDOW)
+        self.batch_waits: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def record(self, system: str, latency: float) -> None:
+        self.requests[system] += 1
+        self.latencies.setdefault(system, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def report(self) -> Dict:
+        """Snapshot for /metrics (latencies in milliseconds)."""
+        uptime = time.perf_counter() - self.start_time
+        latency = {}
+        for system, window in self.latencies.items():
+            values = np.array(window) * 1000
+            latency[system] = {
+                "count": len(values),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "p99_ms": float(np.percentile(values, 99)),
+                "max_ms": float(values.max()),
+            }
+
+        return {
+            "uptime_s": uptime,
+            "requests": dict(self.requests),
+            "errors": dict(self.errors),
+            "qps": sum(self.requests.values()) / max(uptime, 1e-9),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": len(self.batch_sizes),
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            "mean_batch_wait_ms": float(np.mean(self.batch_waits)) * 1000 if self.batch_waits else 0.0,
+            "latency": latency,
+        }
+
+class MicroBatcher:
+    """
+    Gathers concurrent dense requests into one FAISS search call.
+
+    A batch is dispatched once it holds `max_batch_size` requests or its
+    oldest request has waited `max_wait_ms`, whichever comes first.
+    """
+
+    def __init__(self, system: HNSWSystem, metrics: Metrics, max_batch_size: int, max_wait_ms: float) -> None:
+        self.system = system
+        self.metrics = metrics
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1) # FAISS parallelizes inside each call
+        self.id_index = load_h5_id_index(QUERIES_EMBEDDINGS_PATH)
+
+    async def search(self, query_id: str, top_k: int) -> RankedResults:
+        """Queue one dense query and wait for its batch to complete."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query_id, top_k, future, time.perf_counter()))
+        self.metrics.queue_depth = self.queue.qsize()
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.metrics.queue_depth)
+        return await future
+
+    async def run(self) -> None:
+        """Form and dispatch batches forever."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # Take whatever is already queued, then wait for stragglers until the deadline
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.queue_depth = self.queue.qsize()
+
+            dispatch_time = time.perf_counter()
+            self.metrics.batch_sizes.append(len(batch))
+            self.metrics.batch_waits.append(dispatch_time - batch[0][3])
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.search_batch, batch)
+            except Exception as error:
+                for _, _, future, _ in batch:
+                    if not future.done(): future.set_exception(error)
+                continue
+
+            for query_id, top_k, future, _ in batch:
+                if future.done(): continue # client went away
+                if query_id in results: future.set_result(results[query_id][:top_k])
+                else: future.set_exception(RequestError(404, f"No embedding for query_id {query_id}"))
+
+    def search_batch(self, batch: List[Tuple]) -> Dict[str, RankedResults]:
+        """Look up, normalize and search the embeddings of one batch (runs in the executor)."""
+        query_ids, query_embeddings = load_h5_embeddings_by_id(
+            QUERIES_EMBEDDINGS_PATH,
+            dict.fromkeys(query_id for query_id, _, _, _ in batch), # unique, in arrival order
+            id_index=self.id_index,
+        )
+        if not len(query_ids): return {}
+
+        faiss.normalize_L2(query_embeddings)
+        top_k = max(top_k for _, top_k, _, _ in batch)
+        return dict(self.system.search_batch(query_ids.tolist(), query_embeddings, top_k))
+
+class SearchServer:
+    """Minimal asyncio HTTP/1.1 server over a loaded HybridSystem (BM25 leg, HNSW leg and fusion)."""
+
+    def __init__(self, hybrid: HybridSystem, max_batch_size: int, max_wait_ms: float) -> None:
+        self.hybrid = hybrid
+        self.metrics = Metrics()
+
+        # Load both indexes once; BM25 runs on a single thread (run_query and LIST_CACHE are not thread-safe)
+        hybrid.bm25.load()
+        hybrid.hnsw.load()
+        hybrid.hnsw.prepare_search()
+        self.bm25_executor = ThreadPoolExecutor(max_workers=1)
+        self.batcher = MicroBatcher(hybrid.hnsw, self.metrics, max_batch_size, max_wait_ms)
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        batcher_task = asyncio.create_task(self.batcher.run())
+        print(f"[Server] Listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip(): break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip(): break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.route(method, target, body)
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close": break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass # malformed request or client disconnected
+        finally:
+            writer.close()
+
+    async def route(self, method: str, target: str, body: bytes) -> Tuple[int, Dict]:
+        """Dispatch one request and return (status, JSON payload)."""
+        url = urlsplit(target)
+        try:
+            if url.path == "/health": return 200, {"status": "ok"}
+            if url.path == "/metrics": return 200, self.metrics.report()
+            if url.path != "/search" or method not in ("GET", "POST"):
+                raise RequestError(404, f"Unknown endpoint {method} {url.path}")
+
+            request = dict(parse_qsl(url.query))
+            if body:
+                try: fields = json.loads(body)
+                except json.JSONDecodeError: raise RequestError(400, "Body must be JSON")
+                if not isinstance(fields, dict): raise RequestError(400, "Body must be a JSON object")
+                request.update(fields)
+            return 200, await self.search(request)
+        except RequestError as error:
+            self.metrics.errors[error.status] += 1
+            return error.status, {"error": str(error)}
+        except Exception as error:
+            self.metrics.errors[500] += 1
+            return 500, {"error": repr(error)}
+
+    async def search(self, request: Dict) -> Dict:
+        """Answer one /search request with the requested system."""
+        system = request.get("system", "hybrid")
+        query_id = str(request.get("query_id", ""))
+        query_text = request.get("query", "")
+        top_k = parse_top_k(request.get("top_k", DEFAULT_TOP_K))
+
+        if system not in ("bm25", "hnsw", "hybrid"): raise RequestError(400, f"Unknown system {system}")
+        if system != "hnsw" and not query_text: raise RequestError(400, f"{system} requires query")
+        if system != "bm25" and not query_id: raise RequestError(400, f"{system} requires query_id")
+
+        start_time = time.perf_counter()
+        if system == "bm25":
+            results = await self.search_bm25(query_text, top_k)
+        elif system == "hnsw":
+            results = await self.batcher.search(query_id, top_k)
+        else:
+            # Both legs run concurrently: BM25 on its thread, HNSW in the next micro-batch
+            candidates = max(self.hybrid.candidates, top_k)
+            bm25_results, hnsw_results = await asyncio.gather(
+                self.search_bm25(query_text, candidates), self.batcher.search(query_id, candidates)
+            )
+            fused = self.hybrid.fuse([(query_id, bm25_results)], [(query_id, hnsw_results)], top_k, show_progress=False)
+            results = fused[0][1]
+        latency = time.perf_counter() - start_time
+        self.metrics.record(system, latency)
+
+        return {
+            "system": system,
+            "query_id": query_id,
+            "results": [[doc_id, float(score)] for doc_id, score in results],
+            "latency_ms": latency * 1000,
+        }
+
+    async def search_bm25(self, query_text: str, top_k: int) -> RankedResults:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.bm25_executor, self.hybrid.bm25.search_text, query_text, top_k)
+
+def main() -> None:
+    # Parse command line arguments
+    parser = ArgumentParser(description="Serve search systems over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    add_system_arguments(parser)
+    args = parser.parse_args()
+
+    # The hybrid system owns the BM25 and HNSW legs, so one load serves all three endpoints
+    hybrid = init_system(HybridSystem, args)
+    server = SearchServer(hybrid, args.max_batch_size, args.max_wait_ms)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(f"\n[Server] Stopped: {json.dumps(server.metrics.report())}")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Base class for all search systems (BM25, HNSW, ReRank).
 """
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List
 
 class SearchSystem(ABC):
     """Abstract base class representing a generic search system."""
@@ -12,8 +12,8 @@ class SearchSystem(ABC):
         self.name = name
 
     @abstractmethod
-    def build(self) -> None:
-        """Build or load resources required by the system."""
+    def build(self, force: bool = False) -> None:
+        """Build or load resources required by the system (force = rebuild even if artifacts are current)."""
         pass
 
     @abstractmethod
@@ -21,6 +21,10 @@ class SearchSystem(ABC):
         """Execute retrieval for given queries."""
         pass
 
+    def iter_search(self, queries: List, top_k: int = 10) -> Iterator:
+        """Yield (query_id, ranked_results) as each query completes (default: from search)."""
+        yield from self.search(queries, top_k=top_k)
+
     @abstractmethod
     def save_run(self, results: List, output_path: str) -> None:
         """Save results to disk in TREC format."""
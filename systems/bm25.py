@@ -3,52 +3,544 @@ BM25 search system using Assignment 2 search_system package.
 """
 
 import os
-from contextlib import redirect_stdout
-from io import StringIO
-from typing import List, Tuple
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+from multiprocessing import Pool
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, TextIO, Tuple
 
 from tqdm import tqdm
 # Assignment 2 search_system package imports
 from search_system.parser import run_parser
-from search_system.indexer import run_indexer
 from search_system.query import run_query, QueryStartupContext
 from search_system.query.query import LIST_CACHE
 
 from systems.base import SearchSystem
+from systems.bm25_delta import DeltaSegment, file_lock, publish_dir, swap_dir
+from utils.cache import fingerprint_paths, iter_cached
+from utils.manifest import manifest_problems, verify_manifest, write_manifest
+from utils.performance import record_latency, record_structure, stage
+from utils.writers import write_run
 from utils.config import DATASET_PATH, SUBSET_PATH, ARTIFACTS_DIR, RUNS_DIR
 
+# Query execution parameters
+BM25_MODE: str = "bwand-or"     # run_query traversal mode
+NUM_WORKERS: int = 1            # Query / parse processes (1 = search and build in this process)
+QUERY_CHUNK_SIZE: int = 64      # Queries dispatched to a worker (or searched between yields serially) at a time
+
+# Build parameters
+COPY_BLOCK_SIZE: int = 16 * 1024 ** 2   # Bytes copied at a time when extracting a collection shard
+
+# Posting list cache parameters
+LIST_CACHE_MB: int = 512        # Resident budget for cached posting lists
+LIST_CACHE_POLICY: str = "lru"  # Eviction policy: "lru" or "lfu"
+
 RankedResults = List[Tuple[int, float]]
 QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
+Segment = Tuple[QueryStartupContext, "BoundedListCache"] # delta segment context and its own list cache
+
+def estimate_bytes(value: Any) -> int:
+    """Approximate resident size of a cached posting list (numpy buffers counted exactly)."""
+    if hasattr(value, "nbytes"): return int(value.nbytes)
+
+    size = sys.getsizeof(value)
+    for attr in getattr(value, "__dict__", {}).values():
+        size += int(attr.nbytes) if hasattr(attr, "nbytes") else sys.getsizeof(attr)
+    if isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in value)
+
+    return size
+
+class BoundedListCache(OrderedDict):
+    """
+    Byte-bounded storage installed as LIST_CACHE.cache.
+
+    run_query keeps using the package's cache API, while this mapping decides
+    what stays resident. Lists touched by the query in progress are pinned
+    (see query_scope) and never evicted, so open cursors stay valid; evicted
+    lists are closed if they expose close().
+    """
+
+    def __init__(self, budget_bytes: int, policy: str = LIST_CACHE_POLICY) -> None:
+        super().__init__()
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.sizes: Dict[Hashable, int] = {}
+        self.frequency: Dict[Hashable, int] = {}
+        self.pinned: set = set()
+        self.pinning = False
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = super().__getitem__(key)
+        self.hits += 1
+        self._touch(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        if key in self: self.bytes -= self.sizes.get(key, 0)
+        else: self.misses += 1 # every miss is followed by a put
+
+        super().__setitem__(key, value)
+        self.sizes[key] = estimate_bytes(value)
+        self.bytes += self.sizes[key]
+        self._touch(key)
+        self._evict()
+
+    def __delitem__(self, key: Hashable) -> None:
+        super().__delitem__(key)
+        self._forget(key)
+
+    def pop(self, key: Hashable, *default: Any) -> Any:
+        if key not in self:
+            if default: return default[0]
+            raise KeyError(key)
+        value = super().pop(key)
+        self._forget(key)
+        return value
+
+    def popitem(self, last: bool = True) -> Tuple[Hashable, Any]:
+        key, value = super().popitem(last)
+        self._forget(key)
+        return key, value
+
+    def clear(self) -> None:
+        super().clear()
+        self.sizes.clear()
+        self.frequency.clear()
+        self.pinned.clear()
+        self.bytes = 0
+
+    @contextmanager
+    def query_scope(self) -> Iterator[None]:
+        """
+        Pin every list touched inside the block; on exit, re-measure them
+        (lists can grow while a query reads them) and evict down to budget.
+        """
+        self.pinning = True
+        try:
+            yield
+        finally:
+            self.pinning = False
+            for key in self.pinned:
+                if key not in self: continue
+                size = estimate_bytes(super().__getitem__(key)) # not a lookup: hit counters stay unchanged
+                self.bytes += size - self.sizes.get(key, 0)
+                self.sizes[key] = size
+            self.pinned.clear()
+            self._evict()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters and current footprint."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+            "bytes": self.bytes,
+        }
+
+    def _touch(self, key: Hashable) -> None:
+        self.move_to_end(key)
+        self.frequency[key] = self.frequency.get(key, 0) + 1
+        if self.pinning: self.pinned.add(key)
+
+    def _forget(self, key: Hashable) -> None:
+        self.bytes -= self.sizes.pop(key, 0)
+        self.frequency.pop(key, None)
+        self.pinned.discard(key)
+
+    def _evict(self) -> None:
+        while self.bytes > self.budget_bytes:
+            candidates = (key for key in self if key not in self.pinned)
+            if self.policy == "lfu":
+                victim = min(candidates, key=lambda key: self.frequency.get(key, 0), default=None)
+            else:
+                victim = next(candidates, None) # least recently used first
+            if victim is None: return # everything left is pinned by the current query
+
+            value = super().pop(victim)
+            self._forget(victim)
+            self.evictions += 1
+            if hasattr(value, "close"): value.close()
+
+class ThreadSilencedStdout:
+    """
+    sys.stdout proxy that drops writes from threads inside silenced() and
+    passes every other thread's output through to the wrapped stream.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self.local = threading.local() # per-thread silenced() depth
+
+    def write(self, text: str) -> int:
+        if getattr(self.local, "depth", 0): return len(text)
+        return self.stream.write(text)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines: self.write(line)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+_STDOUT_LOCK = threading.Lock()
+
+@contextmanager
+def silenced() -> Iterator[None]:
+    """
+    Suppress run_query's prints (timing info) on the calling thread only.
+
+    redirect_stdout swaps the process-wide sys.stdout, which would also swallow
+    the output of threads running alongside BM25 (the hybrid HNSW leg, the server).
+    """
+    with _STDOUT_LOCK:
+        if not isinstance(sys.stdout, ThreadSilencedStdout): sys.stdout = ThreadSilencedStdout(sys.stdout)
+        proxy = sys.stdout
+
+    proxy.local.depth = getattr(proxy.local, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        proxy.local.depth -= 1
+
+class SegmentListCaches:
+    """
+    LIST_CACHE.cache stand-in that routes run_query's cache calls to a segment's cache.
+
+    The main index's BoundedListCache is used unless the calling thread selected
+    another one with using() (the delta segment's: term keys would collide), so
+    LIST_CACHE.cache itself never changes while other threads query.
+    """
+
+    def __init__(self, main: BoundedListCache) -> None:
+        self.main = main
+        self.local = threading.local() # cache selected by the calling thread
+
+    def current(self) -> BoundedListCache:
+        cache = getattr(self.local, "cache", None)
+        return self.main if cache is None else cache
+
+    @contextmanager
+    def using(self, cache: BoundedListCache) -> Iterator[None]:
+        previous = getattr(self.local, "cache", None)
+        self.local.cache = cache
+        try:
+            yield
+        finally:
+            self.local.cache = previous
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.current(), name)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.current()
+
+    def __getitem__(self, key: Hashable) -> Any:
+        return self.current()[key]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.current()[key] = value
+
+    def __delitem__(self, key: Hashable) -> None:
+        del self.current()[key]
+
+    def __len__(self) -> int:
+        return len(self.current())
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.current())
+
+def install_list_cache(budget_mb: int = LIST_CACHE_MB, policy: str = LIST_CACHE_POLICY) -> BoundedListCache:
+    """
+    Swap LIST_CACHE storage for SegmentListCaches over a BoundedListCache and disable
+    its count-based eviction; returns the main index's cache.
+    """
+    if not isinstance(LIST_CACHE.cache, SegmentListCaches):
+        LIST_CACHE.cache = SegmentListCaches(BoundedListCache(budget_mb * 1024 ** 2, policy))
+    cache = LIST_CACHE.cache.main
+    cache.budget_bytes = budget_mb * 1024 ** 2
+    cache.policy = policy
+    LIST_CACHE.capacity = sys.maxsize # the byte budget decides eviction instead
+
+    return cache
+
+def byte_ranges(file_path: str, num_shards: int) -> List[Tuple[int, int]]:
+    """Split a text file into num_shards (start, stop) byte ranges that begin and end on line boundaries."""
+    size = os.path.getsize(file_path)
+    bounds = [0]
+    with open(file_path, "rb") as input_file:
+        for shard in range(1, num_shards):
+            input_file.seek(max(size * shard // num_shards, bounds[-1]))
+            if input_file.tell() > 0: input_file.readline() # move to the start of the next line
+            bounds.append(min(input_file.tell(), size))
+    bounds.append(size)
+
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def _parse_shard(task: Tuple[str, int, int, str]) -> Tuple[int, int, float]:
+    """
+    Extract one byte range of the collection to its own file and parse it (runs in a worker process).
+
+    Returns:
+        (lines, bytes, seconds) for the shard.
+    """
+    dataset_path, start, stop, shard_dir = task
+    start_time = time.perf_counter()
+    os.makedirs(shard_dir, exist_ok=True)
+    shard_path = os.path.join(shard_dir, "collection.tsv")
+
+    # run_parser reads whole files, so each worker materializes its own range (copies run in parallel)
+    lines = 0
+    with open(dataset_path, "rb") as input_file, open(shard_path, "wb") as shard_file:
+        input_file.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            block = input_file.read(min(COPY_BLOCK_SIZE, remaining))
+            if not block: break
+            shard_file.write(block)
+            lines += block.count(b"\n")
+            remaining -= len(block)
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        run_parser(dataset_path=shard_path, subset_ids_path=SUBSET_PATH, output_dir=os.path.join(shard_dir, "postings"))
+    os.remove(shard_path)
+
+    return lines, stop - start, time.perf_counter() - start_time
+
+def load_segment(index_dir: str, cache_mb: int, cache_policy: str) -> Segment:
+    """Load a delta segment's context with a list cache of its own (term keys would collide with the main index)."""
+    return QueryStartupContext(index_dir), BoundedListCache(cache_mb * 1024 ** 2, cache_policy)
+
+def merge_segments(ranked: RankedResults, delta_ranked: RankedResults, top_k: int) -> RankedResults:
+    """Merge main and delta results by score; a doc ID in both keeps its delta (newer) entry."""
+    delta_doc_ids = {doc_id for doc_id, _ in delta_ranked}
+    merged = delta_ranked + [(doc_id, score) for doc_id, score in ranked if doc_id not in delta_doc_ids]
+    return sorted(merged, key=lambda result: result[1], reverse=True)[:top_k]
+
+def run_segments(context: QueryStartupContext, delta: Segment | None, query_text: str, top_k: int) -> RankedResults:
+    """Run one query on the main index and, if present, the delta segment (see install_list_cache)."""
+    caches: SegmentListCaches = LIST_CACHE.cache
+    with caches.main.query_scope():
+        ranked = run_query(startup_context=context, query=query_text, mode=BM25_MODE, top_k=top_k)
+    if delta is None: return ranked
+
+    # run_query reads LIST_CACHE, so route this thread's lookups to the delta's cache for the delta query
+    delta_context, delta_cache = delta
+    with caches.using(delta_cache), delta_cache.query_scope():
+        delta_ranked = run_query(startup_context=delta_context, query=query_text, mode=BM25_MODE, top_k=top_k)
+
+    return merge_segments(ranked, delta_ranked, top_k)
+
+class IndexReader:
+    """
+    Query contexts for the main index and delta segment, reopened when a build,
+    merge or ingest publishes a new version (see systems.bm25_delta.publish_dir).
+
+    Contexts are opened on the resolved version directory, which stays on disk
+    after it is superseded, so queries in flight finish on the version they started with.
+    """
+
+    def __init__(self, index_dir: str, delta_index_dir: str, cache_mb: int, cache_policy: str, name: str = "BM25") -> None:
+        self.name = name
+        self.index_dir = index_dir
+        self.delta_index_dir = delta_index_dir
+        self.cache_mb = cache_mb
+        self.cache_policy = cache_policy
+        self.context: QueryStartupContext | None = None
+        self.delta: Segment | None = None
+        self.loaded: Tuple[str, str | None] | None = None # version directories of the open contexts
+
+    def current_dirs(self) -> Tuple[str, str | None]:
+        delta_dir = os.path.realpath(self.delta_index_dir) if os.path.isdir(self.delta_index_dir) else None
+        return os.path.realpath(self.index_dir), delta_dir
+
+    def stale(self) -> bool:
+        """True before the first refresh() and whenever a new version has been published since."""
+        return self.current_dirs() != self.loaded
+
+    def refresh(self) -> bool:
+        """Open the current versions if they changed since the last call; returns True if anything was (re)opened."""
+        index_dir, delta_dir = self.current_dirs()
+        loaded_index_dir, loaded_delta_dir = self.loaded or (None, None)
+        if (index_dir, delta_dir) == self.loaded: return False
+
+        if index_dir != loaded_index_dir:
+            if self.context is not None:
+                print(f"[{self.name}] Index changed, reloading {index_dir}")
+                LIST_CACHE.cache.main.clear() # lists of the previous version
+            self.context = QueryStartupContext(index_dir)
+        if delta_dir != loaded_delta_dir:
+            self.delta = load_segment(delta_dir, self.cache_mb, self.cache_policy) if delta_dir is not None else None
+
+        self.loaded = (index_dir, delta_dir)
+        return True
+
+    def search(self, query_text: str, top_k: int) -> RankedResults:
+        return run_segments(self.context, self.delta, query_text, top_k)
+
+# Per-process state for worker processes (set by _init_worker)
+_WORKER_READER: IndexReader | None = None
+
+def _init_worker(index_dir: str, delta_index_dir: str, cache_mb: int, cache_policy: str) -> None:
+    """Load the index (and delta segment) once per worker process and silence run_query output for its lifetime."""
+    global _WORKER_READER
+    sys.stdout = open(os.devnull, "w")
+
+    install_list_cache(cache_mb, cache_policy) # each worker gets its own bounded posting list cache
+
+    _WORKER_READER = IndexReader(index_dir, delta_index_dir, cache_mb, cache_policy)
+    _WORKER_READER.refresh()
+
+def _search_chunk(chunk: List[Tuple[str, str]], top_k: int) -> Tuple[List[QueryResult], List[float]]:
+    """Run a chunk of queries against the worker's contexts; returns the results and each query's seconds."""
+    _WORKER_READER.refresh() # pick up a merge or ingest published since the last chunk
+    results: List[QueryResult] = []
+    latencies: List[float] = []
+    for query_id, query_text in chunk:
+        start_time = time.perf_counter()
+        results.append((query_id, _WORKER_READER.search(query_text, top_k)))
+        latencies.append(time.perf_counter() - start_time)
+
+    return results, latencies
 
 class BM25System(SearchSystem):
-    """Implements the BM25 retrieval system using the search_system package."""
+    """
+    Implements the BM25 retrieval system using the search_system package.
 
-    def __init__(self) -> None:
+    Passages added with ingest() go to a delta segment (see DeltaSegment)
+    that is searched alongside the main index until it is merged.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = NUM_WORKERS,
+        list_cache_mb: int = LIST_CACHE_MB,
+        list_cache_policy: str = LIST_CACHE_POLICY,
+        result_cache_mb: int | None = None,
+    ) -> None:
         super().__init__("BM25")
-        self.context: QueryStartupContext | None = None # loaded once before querying
+        self.delta_segment = DeltaSegment(os.path.join(ARTIFACTS_DIR, self.name.lower()), self.name)
+        self.num_workers = num_workers
+        self.list_cache_mb = list_cache_mb
+        self.list_cache_policy = list_cache_policy
+        self.reader = IndexReader( # opened by load(), reopened when a new index version is published
+            self.delta_segment.main_index_dir, self.delta_segment.index_dir, list_cache_mb, list_cache_policy, self.name
+        )
+        self.result_cache_mb = result_cache_mb # on-disk result cache budget (None = disabled)
 
-    def build(self) -> None:
+    def build_inputs(self) -> Dict[str, str]:
+        """Input files the index is built from (fingerprinted in its manifest)."""
+        return {"dataset": DATASET_PATH, "subset_ids": SUBSET_PATH}
+
+    def build_params(self) -> Dict[str, str]:
+        """Parameters that determine the built index (BM25 scoring and traversal are query-time settings)."""
+        return {"index": type(self).__name__}
+
+    def artifact_paths(self) -> List[str]:
+        """Main index directory (fingerprinted by the manifest and the result cache)."""
+        return [os.path.join(ARTIFACTS_DIR, self.name.lower(), "index")]
+
+    def build(self, force: bool = False) -> None:
         """
         Build BM25 index by parsing the raw dataset (filtered to subset IDs)
         and indexing the resulting posting chunks.
-        Outputs are stored under artifacts/bm25/.
+        With num_workers > 1, the dataset is split into byte-range shards parsed in parallel.
+        Outputs are stored under artifacts/bm25/, with a manifest; the build is
+        skipped when the manifest matches the current inputs. Postings and index are
+        written to fresh staging directories and swapped in, so chunks left by an
+        earlier build (e.g. with a different shard count) are never indexed.
+
+        Args:
+            force: Rebuild even if the existing index is current.
         """
-        postings_dir = os.path.join(ARTIFACTS_DIR, self.name.lower(), "postings")
-        index_dir = os.path.join(ARTIFACTS_DIR, self.name.lower(), "index")
-        os.makedirs(postings_dir, exist_ok=True)
-        os.makedirs(index_dir, exist_ok=True)
-        
+        build_dir = os.path.join(ARTIFACTS_DIR, self.name.lower())
+        if not force and not manifest_problems(build_dir, self.build_inputs(), self.build_params(), self.artifact_paths()):
+            print(f"[{self.name}] Index is up to date with its inputs and parameters, skipping build (--force rebuilds)")
+            return
+
+        postings_dir = os.path.join(build_dir, "postings")
+        index_dir = os.path.join(build_dir, "index")
+        staging_postings_dir = f"{postings_dir}.building"
+        staging_index_dir = f"{index_dir}.building"
+        shutil.rmtree(staging_postings_dir, ignore_errors=True)
+        shutil.rmtree(staging_index_dir, ignore_errors=True)
+        os.makedirs(staging_postings_dir)
+
         print(f"[{self.name}] Starting build pipeline...")
-        run_parser(
-            dataset_path=DATASET_PATH,
-            subset_ids_path=SUBSET_PATH,
-            output_dir=postings_dir
-        )
-        run_indexer(
-            input_dir=postings_dir,
-            output_dir=index_dir
+        dataset_mb = os.path.getsize(DATASET_PATH) / (1024 ** 2)
+        parse_start = time.perf_counter()
+        with stage("parse"):
+            if self.num_workers > 1:
+                self.parse_parallel(staging_postings_dir)
+            else:
+                run_parser(
+                    dataset_path=DATASET_PATH,
+                    subset_ids_path=SUBSET_PATH,
+                    output_dir=staging_postings_dir
+                )
+        parse_seconds = time.perf_counter() - parse_start
+
+        index_start = time.perf_counter()
+        # Hold the merge lock so a delta merge never reads postings/ or swaps index/ mid-build
+        with stage("index"), file_lock(self.delta_segment.merge_lock_path):
+            self.delta_segment.index_main(staging_postings_dir, staging_index_dir) # collection postings plus merged ingests
+            swap_dir(staging_postings_dir, postings_dir)
+            publish_dir(staging_index_dir, index_dir) # readers of the previous version reload on their next query
+        index_seconds = time.perf_counter() - index_start
+        write_manifest(build_dir, self.build_inputs(), self.build_params(), self.artifact_paths())
+
+        print(
+            f"[{self.name}] Build stages: parse={parse_seconds:.2f}s ({dataset_mb / max(parse_seconds, 1e-9):.1f}MB/s), "
+            f"index={index_seconds:.2f}s, total={parse_seconds + index_seconds:.2f}s"
         )
 
+    def parse_parallel(self, postings_dir: str) -> None:
+        """
+        Parse byte-range shards of the dataset in num_workers processes, each into its
+        own postings directory, then move every chunk file into postings_dir
+        (renamed `<chunk>_shard<i><ext>`) for a single indexing step.
+        """
+        shards_dir = os.path.join(ARTIFACTS_DIR, self.name.lower(), "shards")
+        shutil.rmtree(shards_dir, ignore_errors=True)
+        ranges = byte_ranges(DATASET_PATH, self.num_workers)
+        tasks = [
+            (DATASET_PATH, start, stop, os.path.join(shards_dir, f"shard_{shard}"))
+            for shard, (start, stop) in enumerate(ranges)
+        ]
+
+        print(f"[{self.name}] Parsing {len(tasks)} byte-range shards on {self.num_workers} processes...")
+        shard_stats: List[Tuple[int, int, float]] = []
+        with Pool(self.num_workers) as pool:
+            with tqdm(total=len(tasks), desc=f"[{self.name}] Parsing shards", unit="shard") as progress:
+                for stats in pool.imap(_parse_shard, tasks):
+                    shard_stats.append(stats)
+                    progress.update(1)
+
+        for shard, (lines, num_bytes, seconds) in enumerate(shard_stats):
+            print(
+                f"[{self.name}] Shard {shard}: {lines} lines, {num_bytes / (1024 ** 2):.1f}MB in {seconds:.2f}s "
+                f"({lines / max(seconds, 1e-9):.0f} lines/s)"
+            )
+
+        # Collect every shard's chunk files into the one postings directory the indexer merges
+        for shard, (_, _, _, shard_dir) in enumerate(tasks):
+            shard_postings_dir = os.path.join(shard_dir, "postings")
+            for chunk_name in sorted(os.listdir(shard_postings_dir)):
+                root, ext = os.path.splitext(chunk_name)
+                os.replace(os.path.join(shard_postings_dir, chunk_name), os.path.join(postings_dir, f"{root}_shard{shard}{ext}"))
+        shutil.rmtree(shards_dir, ignore_errors=True)
+
     def search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> List[QueryResult]:
         """
         Execute BM25 retrieval for a list of queries.
@@ -60,50 +552,145 @@ class BM25System(SearchSystem):
         Returns:
             A list of (query_id, ranked_results) pairs.
         """
-        # Prevent mid-query eviction from closing file handles
-        LIST_CACHE.cache.clear()
-        LIST_CACHE.capacity = 1000000 # big enough to avoid eviction
-        
+        return list(self.iter_search(queries, top_k))
+
+    def iter_search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> Iterator[QueryResult]:
+        """
+        Execute BM25 retrieval, yielding (query_id, ranked_results) as each query completes.
+        With a result cache, only queries missing from it are searched.
+
+        Args:
+            queries: List of (query_id, query_text) pairs.
+            top_k: Number of top documents to retrieve per query.
+        """
+        if self.result_cache_mb is None:
+            yield from self._iter_search(queries, top_k)
+            return
+
         index_dir = os.path.join(ARTIFACTS_DIR, self.name.lower(), "index")
-        
-        if self.context is None:
+        params = {"mode": BM25_MODE, "top_k": top_k}
+        yield from iter_cached(
+            self.name, fingerprint_paths([index_dir, self.delta_segment.index_dir]), params, queries,
+            partial(self._iter_search, top_k=top_k), self.result_cache_mb,
+        )
+
+    def verify(self) -> None:
+        """Refuse an index whose manifest does not match the current inputs (see utils.manifest)."""
+        verify_manifest(
+            self.name, os.path.join(ARTIFACTS_DIR, self.name.lower()),
+            self.build_inputs(), self.build_params(), self.artifact_paths(),
+        )
+
+    def load(self) -> BoundedListCache:
+        """
+        Install the bounded posting list cache and load the query context (and delta segment),
+        or reload them if a build, merge or ingest published a new version since the last call.
+        """
+        # Bound posting list memory; lists in use by a query are pinned, so eviction never closes them mid-query
+        cache = install_list_cache(self.list_cache_mb, self.list_cache_policy)
+
+        if self.reader.context is None:
+            self.verify() # once: a merge publishes its index just before it records itself in the manifest
             print(f"[{self.name}] Loading index...")
-            self.context = QueryStartupContext(index_dir)
-        
-        all_results: List[QueryResult] = []
+        if self.reader.stale():
+            with stage("load index"):
+                self.reader.refresh()
+            if self.reader.delta is not None:
+                print(f"[{self.name}] Loaded delta segment ({self.delta_segment.num_docs()} passages)")
+
+        return cache
+
+    def ingest(self, passages_path: str, merge_threshold: int | None = None) -> None:
+        """
+        Add new passages without a full rebuild: they are indexed into the delta
+        segment, and a background merge is started once it holds `merge_threshold` passages.
+
+        Args:
+            passages_path: TSV of new passages (`<pid>\t<text>` per line).
+            merge_threshold: Delta size that triggers a merge (None = never merge automatically).
+        """
+        num_docs = self.delta_segment.ingest(passages_path)
+        delta_docs = self.delta_segment.num_docs()
+        print(f"[{self.name}] Ingested {num_docs} passages (delta segment: {delta_docs} passages)")
+
+        if merge_threshold is not None and delta_docs >= merge_threshold:
+            self.delta_segment.merge_in_background()
+
+    def merge(self) -> None:
+        """Merge the delta segment into the main index in this process."""
+        self.delta_segment.merge()
+
+    def search_text(self, query_text: str, top_k: int = 10) -> RankedResults:
+        """
+        Execute one BM25 query in this process (loading or reloading the index first, see load()).
+        run_query's prints are dropped for this thread only (see silenced()).
+
+        Args:
+            query_text: Query string.
+            top_k: Number of top documents to retrieve.
+        """
+        self.load()
+        with silenced():
+            return self.reader.search(query_text, top_k)
+
+    def _iter_search(self, queries: List[Tuple[str, str]], top_k: int) -> Iterator[QueryResult]:
+        """Search every query against the index (no result cache)."""
+        if self.num_workers > 1:
+            self.verify() # workers load the index themselves
+            index_dir = os.path.join(ARTIFACTS_DIR, self.name.lower(), "index")
+            yield from self._iter_search_parallel(queries, top_k, index_dir)
+            return
+
         with tqdm(total=len(queries), desc=f"[{self.name}] Searching queries", unit="query") as progress:
-            for query_id, query_text in queries:
-                # Suppress prints from run_query (timing info)
-                with redirect_stdout(StringIO()):
-                    results = run_query(
-                        startup_context=self.context,
-                        query=query_text,
-                        mode="bwand-or",
-                        top_k=top_k
-                    )
-                
-                all_results.append((query_id, results))
-                progress.update(1)
-        
-        return all_results
+            for start in range(0, len(queries), QUERY_CHUNK_SIZE):
+                cache = self.load() # per chunk, to pick up a newly published index version
+                # Suppress prints from run_query (timing info) on this thread once per chunk,
+                # releasing stdout while the caller consumes the chunk's results
+                chunk_results: List[QueryResult] = []
+                with stage("search"), silenced():
+                    for query_id, query_text in queries[start:start + QUERY_CHUNK_SIZE]:
+                        start_time = time.perf_counter()
+                        chunk_results.append((query_id, self.reader.search(query_text, top_k)))
+                        record_latency(self.name, time.perf_counter() - start_time)
+                progress.update(len(chunk_results))
+                yield from chunk_results
+
+        cache = self.load()
+        stats = cache.stats()
+        record_structure(self.name, "list_cache", stats["bytes"])
+        if self.reader.delta is not None: record_structure(self.name, "delta_list_cache", self.reader.delta[1].bytes)
+        print(
+            f"[{self.name}] List cache: hit_rate={stats['hit_rate']:.2%}, evictions={stats['evictions']}, "
+            f"entries={stats['entries']}, resident={stats['bytes'] / (1024 ** 2):.2f}MB"
+        )
+
+    def _iter_search_parallel(self, queries: List[Tuple[str, str]], top_k: int, index_dir: str) -> Iterator[QueryResult]:
+        """
+        Execute queries across worker processes, each with its own
+        QueryStartupContext and LIST_CACHE. Results keep input order.
+        """
+        chunks = [queries[start:start + QUERY_CHUNK_SIZE] for start in range(0, len(queries), QUERY_CHUNK_SIZE)]
+
+        print(f"[{self.name}] Starting {self.num_workers} workers...")
+        init_args = (index_dir, self.delta_segment.index_dir, self.list_cache_mb, self.list_cache_policy)
+        with Pool(self.num_workers, initializer=_init_worker, initargs=init_args) as pool:
+            with tqdm(total=len(queries), desc=f"[{self.name}] Searching queries", unit="query") as progress:
+                # imap yields chunk results in submission order; latencies are measured in the workers
+                for chunk_results, latencies in pool.imap(partial(_search_chunk, top_k=top_k), chunks):
+                    for seconds in latencies: record_latency(self.name, seconds)
+                    progress.update(len(chunk_results))
+                    yield from chunk_results
 
-    def save_run(self, results: List[QueryResult], output_filename: str) -> None:
+    def save_run(self, results: Iterable[QueryResult], output_filename: str) -> None:
         """
-        Save ranked retrieval results in plain tab-separated format.
+        Save ranked retrieval results (plain tab-separated, or binary columnar for .npz filenames).
 
         Args:
-            results: List of (query_id, ranked_results) pairs.
+            results: (query_id, ranked_results) pairs; a generator is written as it yields.
             output_filename: Name of the output file (saved under runs/bm25/).
         """
         output_dir = os.path.join(RUNS_DIR, self.name.lower())
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, output_filename)
         
-        with open(output_path, "w", encoding="utf-8") as output_file:
-            with tqdm(total=len(results), desc=f"[{self.name}] Saving results", unit="query") as progress:
-                for query_id, ranked_docs in results:
-                    for rank, (doc_id, score) in enumerate(ranked_docs, start=1):
-                        # Columns: query_id, doc_id, rank, score
-                        output_file.write(f"{query_id}\t{doc_id}\t{rank}\t{score:.6f}\n")
-                    
-                    progress.update(1)
\ No newline at end of file
+        write_run(results, output_path, desc=f"[{self.name}] Saving results")
\ No newline at end of file
@@ -0,0 +1,321 @@
+"""
+Delta segment for incremental BM25 ingest: new passages are indexed on their own
+and merged into the main index once the segment grows past a threshold.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Set
+
+# Assignment 2 search_system package imports
+from search_system.parser import run_parser
+from search_system.indexer import run_indexer
+
+from utils.manifest import record_ingest
+from utils.config import SUBSET_PATH
+
+# Delta segment parameters
+MERGE_THRESHOLD: int = 100000   # Delta passages that trigger a background merge into the main index
+LOCK_POLL_SECONDS: float = 0.5  # Wait between attempts to take the segment lock
+INDEX_VERSIONS_KEPT: int = 2    # Superseded index versions kept for readers that have not reloaded yet
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+@contextmanager
+def file_lock(lock_path: str, wait: bool = True) -> Iterator[bool]:
+    """
+    Hold an exclusive lock file (containing the owner's pid) for the block.
+    Locks left behind by a dead process are taken over.
+
+    Yields:
+        True if the lock is held; False if `wait` is off and another process owns it.
+    """
+    while True:
+        try:
+            descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                with open(lock_path, "r", encoding="utf-8") as lock_file: owner = int(lock_file.read() or 0)
+            except (OSError, ValueError):
+                owner = 0
+            if owner and not _pid_alive(owner):
+                os.remove(lock_path) # stale lock from a crashed process
+                continue
+            if not wait:
+                yield False
+                return
+            time.sleep(LOCK_POLL_SECONDS)
+
+    try:
+        os.write(descriptor, str(os.getpid()).encode("utf-8"))
+        os.close(descriptor)
+        yield True
+    finally:
+        os.remove(lock_path)
+
+def swap_dir(new_dir: str, target_dir: str) -> None:
+    """Replace target_dir with new_dir (the old contents are deleted)."""
+    old_dir = f"{target_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(target_dir): os.rename(target_dir, old_dir)
+    os.rename(new_dir, target_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def index_versions(link_path: str) -> List[str]:
+    """Published versions of an index (`<link_path>.v<generation>` directories), oldest first."""
+    parent, name = os.path.split(link_path)
+    versions = [
+        entry for entry in os.listdir(parent or ".")
+        if entry.startswith(f"{name}.v") and entry[len(name) + 2:].isdigit()
+    ] if os.path.isdir(parent or ".") else []
+    return [os.path.join(parent, entry) for entry in sorted(versions, key=lambda entry: int(entry[len(name) + 2:]))]
+
+def prune_versions(link_path: str) -> None:
+    """Delete index versions that are neither current nor among the INDEX_VERSIONS_KEPT newest superseded ones."""
+    current = os.path.realpath(link_path) if os.path.lexists(link_path) else None
+    superseded = [path for path in index_versions(link_path) if os.path.realpath(path) != current]
+    for path in superseded[:max(len(superseded) - INDEX_VERSIONS_KEPT, 0)]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def publish_dir(new_dir: str, link_path: str) -> None:
+    """
+    Make new_dir the current version of an index.
+
+    new_dir is renamed to `<link_path>.v<generation>` and link_path, a symlink,
+    is atomically repointed at it. Superseded versions stay on disk (see
+    prune_versions), so processes that opened the previous version keep
+    searching it until they notice the new link and reload (see
+    BM25System.load); an index directory from before versioning is kept as `.v0`.
+    """
+    version_dir = f"{link_path}.v{time.time_ns()}"
+    os.rename(new_dir, version_dir)
+    if os.path.isdir(link_path) and not os.path.islink(link_path): os.rename(link_path, f"{link_path}.v0")
+
+    temp_link = f"{link_path}.link"
+    if os.path.lexists(temp_link): os.remove(temp_link)
+    os.symlink(os.path.basename(version_dir), temp_link) # relative, so the tree can be moved
+    os.replace(temp_link, link_path)
+    prune_versions(link_path)
+
+def unpublish_dir(link_path: str) -> None:
+    """Remove the current-version link of an index, keeping recent versions for readers that still use them."""
+    if os.path.lexists(link_path): os.remove(link_path)
+    prune_versions(link_path)
+
+def link_or_copy(source_path: str, target_path: str) -> None:
+    """Hard-link a file (no data copied), falling back to a copy across filesystems."""
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copy2(source_path, target_path)
+
+def read_ids(ids_path: str) -> Iterator[str]:
+    """Passage IDs from an ID list or passages TSV (first tab-separated column per line)."""
+    if not os.path.exists(ids_path): return
+    with open(ids_path, "r", encoding="utf-8") as ids_file:
+        for line in ids_file:
+            passage_id = line.split("\t", 1)[0].strip()
+            if passage_id: yield passage_id
+
+class DeltaSegment:
+    """
+    Passages ingested since the last build or merge, under artifacts/bm25/delta/.
+
+    Each ingest parses one batch of passages into its own chunk files (renamed
+    `<chunk>_<batch><ext>` so batches never overwrite each other) and re-indexes
+    only the delta postings, so ingest cost follows the size of the delta rather
+    than the collection. A merge indexes the main postings plus a snapshot of the
+    delta batches into a fresh main index, swaps it in and moves those batches'
+    chunks to artifacts/bm25/merged/ (kept apart from the postings the build
+    parses); passages ingested while a merge runs stay in the delta.
+
+    Postings cannot be edited in place, so passage IDs that are already indexed
+    (the collection subset, or an earlier ingest) are skipped rather than replaced.
+
+    Delta scores use the delta's own collection statistics (document count,
+    average length, document frequencies), so they only approximate full-index
+    BM25 until the segment is merged.
+    """
+
+    def __init__(self, bm25_dir: str, name: str = "BM25") -> None:
+        self.name = name
+        self.bm25_dir = bm25_dir
+        self.main_postings_dir = os.path.join(bm25_dir, "postings")
+        self.main_index_dir = os.path.join(bm25_dir, "index")
+        self.merged_dir = os.path.join(bm25_dir, "merged") # delta chunks folded into the main index
+        self.ingested_ids_path = os.path.join(bm25_dir, "ingested_ids.txt")
+        self.delta_dir = os.path.join(bm25_dir, "delta")
+        self.postings_dir = os.path.join(self.delta_dir, "postings")
+        self.index_dir = os.path.join(self.delta_dir, "index")
+        self.segment_path = os.path.join(self.delta_dir, "segment.json")
+        self.segment_lock_path = os.path.join(bm25_dir, "segment.lock")
+        self.merge_lock_path = os.path.join(bm25_dir, "merge.lock")
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.index_dir)
+
+    def batches(self) -> List[Dict]:
+        """Ingested batches still in the delta: [{"batch", "docs", "chunks"}, ...]."""
+        if not os.path.exists(self.segment_path): return []
+        with open(self.segment_path, "r", encoding="utf-8") as segment_file:
+            return json.load(segment_file)["batches"]
+
+    def num_docs(self) -> int:
+        return sum(batch["docs"] for batch in self.batches())
+
+    def indexed_ids(self) -> Set[str]:
+        """Passage IDs in the main index or the delta: the collection subset plus every ingested ID."""
+        return {*read_ids(SUBSET_PATH), *read_ids(self.ingested_ids_path)}
+
+    def index_main(self, postings_dir: str, output_dir: str, extra_chunks: Iterable[str] = ()) -> None:
+        """
+        Index the collection postings in postings_dir, every merged delta chunk and
+        extra_chunks (paths) into output_dir, via hard links in a temporary input directory.
+        """
+        input_dir = f"{output_dir}.input"
+        shutil.rmtree(input_dir, ignore_errors=True)
+        os.makedirs(input_dir)
+        try:
+            for source_dir in (postings_dir, self.merged_dir):
+                if not os.path.isdir(source_dir): continue
+                for chunk_name in os.listdir(source_dir):
+                    link_or_copy(os.path.join(source_dir, chunk_name), os.path.join(input_dir, chunk_name))
+            for chunk_path in extra_chunks:
+                link_or_copy(chunk_path, os.path.join(input_dir, os.path.basename(chunk_path)))
+
+            run_indexer(input_dir=input_dir, output_dir=output_dir)
+        finally:
+            shutil.rmtree(input_dir, ignore_errors=True)
+
+    def ingest(self, passages_path: str) -> int:
+        """
+        Parse a TSV of new passages (`<pid>\\t<text>` per line) into a new delta batch
+        and re-index the delta segment. Passages whose ID is already indexed are skipped.
+
+        Returns:
+            Number of passages in the batch.
+        """
+        batch = f"batch{time.time_ns()}"
+        staging_dir = os.path.join(self.bm25_dir, f"ingest_{batch}") # outside delta/, which a merge may remove
+        staging_postings_dir = os.path.join(staging_dir, "postings")
+
+        # The parser filters by a subset ID list; here the subset is exactly the new, unindexed passages
+        passage_ids = list(read_ids(passages_path))
+        indexed_ids = self.indexed_ids()
+        new_ids = [passage_id for passage_id in dict.fromkeys(passage_ids) if passage_id not in indexed_ids]
+        num_docs = len(new_ids)
+        if len(passage_ids) > num_docs:
+            print(f"[{self.name}] Skipping {len(passage_ids) - num_docs} passages whose IDs are already indexed")
+        if not new_ids: return 0
+
+        os.makedirs(staging_postings_dir, exist_ok=True)
+        ids_path = os.path.join(staging_dir, "ids.tsv")
+        with open(ids_path, "w", encoding="utf-8") as ids_file:
+            ids_file.writelines(f"{passage_id}\n" for passage_id in new_ids)
+
+        print(f"[{self.name}] Parsing {num_docs} new passages into delta {batch}...")
+        run_parser(dataset_path=passages_path, subset_ids_path=ids_path, output_dir=staging_postings_dir)
+
+        with file_lock(self.segment_lock_path):
+            os.makedirs(self.postings_dir, exist_ok=True)
+            chunks: List[str] = []
+            for chunk_name in sorted(os.listdir(staging_postings_dir)):
+                root, ext = os.path.splitext(chunk_name)
+                chunks.append(f"{root}_{batch}{ext}")
+                os.rename(os.path.join(staging_postings_dir, chunk_name), os.path.join(self.postings_dir, chunks[-1]))
+
+            self._write_batches([*self.batches(), {"batch": batch, "docs": num_docs, "chunks": chunks}])
+            with open(self.ingested_ids_path, "a", encoding="utf-8") as ingested_file:
+                ingested_file.writelines(f"{passage_id}\n" for passage_id in new_ids)
+            self._reindex()
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return num_docs
+
+    def merge(self) -> bool:
+        """
+        Fold the current delta batches into the main index.
+
+        The main index is rebuilt from hard links to the main, merged and delta
+        chunk files (see index_main), so searches keep using the old index and
+        delta until the new version is published (see publish_dir), and processes
+        that loaded the old one switch on their next query. Returns False if
+        another merge is running.
+        """
+        with file_lock(self.merge_lock_path, wait=False) as acquired:
+            if not acquired:
+                print(f"[{self.name}] A delta merge is already running.")
+                return False
+
+            snapshot = self.batches()
+            if not snapshot:
+                print(f"[{self.name}] Delta segment is empty, nothing to merge.")
+                return True
+
+            staging_index_dir = f"{self.main_index_dir}.merging"
+            shutil.rmtree(staging_index_dir, ignore_errors=True)
+            snapshot_chunks = [os.path.join(self.postings_dir, chunk_name) for batch in snapshot for chunk_name in batch["chunks"]]
+
+            merge_start = time.perf_counter()
+            print(f"[{self.name}] Merging {len(snapshot)} delta batches ({sum(batch['docs'] for batch in snapshot)} passages)...")
+            self.index_main(self.main_postings_dir, staging_index_dir, snapshot_chunks)
+
+            # Swap in the merged index, then move only the merged batches out of the delta
+            with file_lock(self.segment_lock_path):
+                publish_dir(staging_index_dir, self.main_index_dir)
+                record_ingest(self.bm25_dir, {"merged": sum(batch["docs"] for batch in snapshot)}, [self.main_index_dir])
+
+                merged = {batch["batch"] for batch in snapshot}
+                remaining = [batch for batch in self.batches() if batch["batch"] not in merged]
+                os.makedirs(self.merged_dir, exist_ok=True)
+                for chunk_path in snapshot_chunks:
+                    os.replace(chunk_path, os.path.join(self.merged_dir, os.path.basename(chunk_path)))
+                self._write_batches(remaining)
+                self._reindex()
+
+            print(f"[{self.name}] Merge finished in {time.perf_counter() - merge_start:.2f}s ({len(remaining)} batches left in delta)")
+            return True
+
+    def merge_in_background(self) -> None:
+        """Start a detached `scripts.ingest --merge` process (output appended to artifacts/bm25/merge.log)."""
+        log_path = os.path.join(self.bm25_dir, "merge.log")
+        with open(log_path, "a", encoding="utf-8") as log_file:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "scripts.ingest", "--system", "bm25", "--merge"],
+                stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True, # survives this process exiting
+            )
+        print(f"[{self.name}] Started background merge (pid {process.pid}, log {log_path})")
+
+    def _reindex(self) -> None:
+        """
+        Publish a new delta/index version from the delta postings (unpublished when
+        the delta is empty). Caller holds the segment lock.
+        """
+        if not self.batches():
+            unpublish_dir(self.index_dir)
+            return
+
+        staging_index_dir = f"{self.index_dir}.next"
+        shutil.rmtree(staging_index_dir, ignore_errors=True)
+        run_indexer(input_dir=self.postings_dir, output_dir=staging_index_dir)
+        publish_dir(staging_index_dir, self.index_dir)
+
+    def _write_batches(self, batches: List[Dict]) -> None:
+        os.makedirs(self.delta_dir, exist_ok=True)
+        temp_path = f"{self.segment_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as segment_file:
+            json.dump({"batches": batches}, segment_file, indent=2)
+        os.replace(temp_path, self.segment_path)
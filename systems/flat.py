@@ -0,0 +1,230 @@
+"""
+Exact (brute-force) dense search system using blocked matrix multiplication.
+"""
+
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+from systems.base import SearchSystem
+from utils.manifest import manifest_problems, verify_manifest, write_manifest
+from utils.loaders import load_h5_id_index, load_h5_embeddings_by_id, load_h5_shape, iter_h5_embeddings
+from utils.performance import record_latency, record_structure, stage
+from utils.writers import write_run
+from utils.config import SUBSET_EMBEDDINGS_PATH, QUERIES_EMBEDDINGS_PATH, ARTIFACTS_DIR, RUNS_DIR
+
+# Blocking parameters (sized so one score block fits in cache/L3: 256 x 16384 float32 = 16MB)
+QUERY_BLOCK_SIZE: int = 256     # Queries scored per matmul
+DOC_BLOCK_SIZE: int = 16384     # Documents scored per matmul
+BUILD_CHUNK_SIZE: int = 10000   # Embeddings read and normalized per streaming step
+
+# Types
+RankedResults = List[Tuple[int, float]]
+QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
+
+def normalize_rows(embeddings: np.ndarray) -> None:
+    """L2-normalize rows in place (matches faiss.normalize_L2)."""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.divide(embeddings, np.maximum(norms, 1e-12), out=embeddings)
+
+def merge_top_k(
+    scores_a: np.ndarray, rows_a: np.ndarray,
+    scores_b: np.ndarray, rows_b: np.ndarray,
+    top_k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge two (scores, rows) candidate sets into the top_k per query (unsorted)."""
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    rows = np.concatenate([rows_a, rows_b], axis=1)
+    if scores.shape[1] <= top_k: return scores, rows
+
+    keep = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    return np.take_along_axis(scores, keep, axis=1), np.take_along_axis(rows, keep, axis=1)
+
+def exact_top_k(
+    query_embeddings: np.ndarray,
+    doc_embeddings: np.ndarray,
+    top_k: int,
+    doc_block_size: int = DOC_BLOCK_SIZE,
+    row_offset: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact inner-product top-k over a document matrix, one document block at a time.
+
+    Args:
+        query_embeddings: Float32 matrix of shape (q, d).
+        doc_embeddings: Float32 matrix of shape (n, d) (may be memory-mapped).
+        top_k: Number of results per query.
+        doc_block_size: Documents scored per matmul.
+        row_offset: Added to returned rows (for callers scoring a slice of a larger matrix).
+
+    Returns:
+        (scores, rows) of shape (q, min(top_k, n)), sorted by descending score.
+    """
+    num_queries = len(query_embeddings)
+    best_scores = np.empty((num_queries, 0), dtype=np.float32)
+    best_rows = np.empty((num_queries, 0), dtype=np.int64)
+
+    for start in range(0, len(doc_embeddings), doc_block_size):
+        end = min(start + doc_block_size, len(doc_embeddings))
+        block_scores = query_embeddings @ np.asarray(doc_embeddings[start:end]).T
+
+        # Reduce the block to its own top-k before merging with the running best
+        if block_scores.shape[1] > top_k:
+            block_rows = np.argpartition(-block_scores, top_k - 1, axis=1)[:, :top_k]
+            block_scores = np.take_along_axis(block_scores, block_rows, axis=1)
+        else:
+            block_rows = np.broadcast_to(np.arange(block_scores.shape[1]), block_scores.shape)
+
+        best_scores, best_rows = merge_top_k(
+            best_scores, best_rows, block_scores, block_rows + (row_offset + start), top_k
+        )
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+
+class FlatSystem(SearchSystem):
+    """Implements exact dense retrieval over a memory-mapped embedding matrix."""
+
+    def __init__(
+        self,
+        batch_size: int = QUERY_BLOCK_SIZE,
+        doc_block_size: int = DOC_BLOCK_SIZE,
+    ) -> None:
+        super().__init__("Flat")
+        self.embeddings: np.ndarray | None = None
+        self.doc_ids: np.ndarray | None = None
+        self.batch_size = batch_size
+        self.doc_block_size = doc_block_size
+        self.build_dir = os.path.join(ARTIFACTS_DIR, self.name.lower())
+
+    def build_params(self) -> Dict[str, str]:
+        """Parameters that determine the built store (recorded in and checked against its manifest)."""
+        return {"index": type(self).__name__}
+
+    def artifact_paths(self) -> List[str]:
+        return [os.path.join(self.build_dir, "embeddings.npy"), os.path.join(self.build_dir, "doc_ids.npy")]
+
+    def build(self, force: bool = False) -> None:
+        """
+        Write normalized document embeddings to a float32 .npy matrix for memory-mapping.
+        Outputs are stored under artifacts/flat/, with a manifest; the build is
+        skipped when the manifest matches the current embeddings file.
+
+        Args:
+            force: Rebuild even if the existing store is current.
+        """
+        inputs = {"embeddings": SUBSET_EMBEDDINGS_PATH}
+        if not force and not manifest_problems(self.build_dir, inputs, self.build_params(), self.artifact_paths()):
+            print(f"[{self.name}] Embedding store is up to date with its inputs, skipping build (--force rebuilds)")
+            return
+
+        os.makedirs(self.build_dir, exist_ok=True)
+        embeddings_path = os.path.join(self.build_dir, "embeddings.npy")
+        doc_ids_path = os.path.join(self.build_dir, "doc_ids.npy")
+
+        num_docs, dim = load_h5_shape(SUBSET_EMBEDDINGS_PATH)
+        embeddings = np.lib.format.open_memmap(embeddings_path, mode="w+", dtype=np.float32, shape=(num_docs, dim))
+
+        # Stream embeddings chunk by chunk straight into the memory-mapped matrix
+        doc_id_chunks: List[np.ndarray] = []
+        offset = 0
+        with stage("write"), tqdm(total=num_docs, desc=f"[{self.name}] Writing embeddings", unit="embedding") as progress:
+            for chunk_ids, chunk_embeddings in iter_h5_embeddings(SUBSET_EMBEDDINGS_PATH, BUILD_CHUNK_SIZE):
+                # Normalize so inner product behaves like cosine similarity
+                normalize_rows(chunk_embeddings)
+                embeddings[offset:offset + len(chunk_embeddings)] = chunk_embeddings
+                doc_id_chunks.append(chunk_ids)
+                offset += len(chunk_embeddings)
+                progress.update(len(chunk_embeddings))
+
+        embeddings.flush()
+        del embeddings
+        doc_ids = np.concatenate(doc_id_chunks) if doc_id_chunks else np.array([], dtype=str)
+        np.save(doc_ids_path, doc_ids.astype(np.int64)) # int64, like the HNSW systems
+        write_manifest(self.build_dir, inputs, self.build_params(), self.artifact_paths())
+
+    def load(self) -> None:
+        """Memory-map the embedding matrix and load doc IDs if not already loaded (refused if its manifest is stale)."""
+        if self.embeddings is not None and self.doc_ids is not None: return
+
+        verify_manifest(self.name, self.build_dir, {"embeddings": SUBSET_EMBEDDINGS_PATH}, self.build_params(), self.artifact_paths())
+        print(f"[{self.name}] Loading embeddings...")
+        with stage("load index"):
+            self.embeddings = np.load(os.path.join(self.build_dir, "embeddings.npy"), mmap_mode="r")
+            self.doc_ids = np.load(os.path.join(self.build_dir, "doc_ids.npy")).astype(np.int64, copy=False)
+        # The matrix is memory-mapped: it counts toward RSS only as pages are touched
+        record_structure(self.name, "vectors (mapped)", self.embeddings.nbytes)
+        record_structure(self.name, "doc_ids", self.doc_ids.nbytes)
+
+    def search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> List[QueryResult]:
+        """
+        Execute exact retrieval for a list of queries.
+
+        Args:
+            queries: List of (query_id, query_text) pairs.
+            top_k: Number of top documents to retrieve per query.
+
+        Returns:
+            A list of (query_id, ranked_results) pairs.
+        """
+        return list(self.iter_search(queries, top_k))
+
+    def iter_search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> Iterator[QueryResult]:
+        """
+        Execute exact retrieval, yielding (query_id, ranked_results) as each query block completes.
+
+        Args:
+            queries: List of (query_id, query_text) pairs.
+            top_k: Number of top documents to retrieve per query.
+        """
+        self.load()
+        with stage("load queries"):
+            id_index = load_h5_id_index(QUERIES_EMBEDDINGS_PATH)
+
+        with tqdm(total=len(queries), desc=f"[{self.name}] Searching queries", unit="query") as progress:
+            for start in range(0, len(queries), self.batch_size):
+                batch = queries[start:start + self.batch_size]
+
+                # Load and normalize only this block's query embeddings
+                with stage("load queries"):
+                    query_ids, query_embeddings = load_h5_embeddings_by_id(
+                        QUERIES_EMBEDDINGS_PATH,
+                        (query_id for query_id, _ in batch),
+                        id_index=id_index,
+                    )
+                    normalize_rows(query_embeddings)
+
+                with stage("search"):
+                    start_time = time.perf_counter()
+                    results = self.search_batch(query_ids.tolist(), query_embeddings, top_k)
+                    record_latency(self.name, time.perf_counter() - start_time, len(results))
+
+                yield from results
+                progress.update(len(batch))
+
+    def search_batch(self, query_ids: List[str], query_embeddings: np.ndarray, top_k: int = 10) -> List[QueryResult]:
+        """Score one block of normalized query embeddings against every document block."""
+        scores, rows = exact_top_k(query_embeddings, self.embeddings, top_k, self.doc_block_size)
+
+        batch_doc_ids = self.doc_ids[rows]
+        return [
+            (query_id, list(zip(batch_doc_ids[row].tolist(), scores[row].tolist())))
+            for row, query_id in enumerate(query_ids)
+        ]
+
+    def save_run(self, results: Iterable[QueryResult], output_filename: str) -> None:
+        """
+        Save ranked retrieval results (plain tab-separated, or binary columnar for .npz filenames).
+
+        Args:
+            results: (query_id, ranked_results) pairs; a generator is written as it yields.
+            output_filename: Name of the output file (saved under runs/flat/).
+        """
+        output_dir = os.path.join(RUNS_DIR, self.name.lower())
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, output_filename)
+
+        write_run(results, output_path, desc=f"[{self.name}] Saving results")
@@ -2,15 +2,22 @@
 HNSW search system using FAISS.
 """
 
+import json
 import os
-from typing import List, Tuple
+import time
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 import faiss
 import numpy as np
 from tqdm import tqdm
 
 from systems.base import SearchSystem
-from utils.loaders import load_h5_embeddings
+from utils.cache import fingerprint_paths, iter_cached
+from utils.manifest import fingerprint_input, manifest_problems, record_ingest, verify_manifest, write_manifest
+from utils.loaders import load_h5_id_index, load_h5_embeddings_by_id, load_h5_shape, iter_h5_embeddings
+from utils.performance import get_memory_usage, record_latency, record_structure, stage
+from utils.writers import write_run
 from utils.config import SUBSET_EMBEDDINGS_PATH, QUERIES_EMBEDDINGS_PATH, ARTIFACTS_DIR, RUNS_DIR
 
 # HNSW tuning parameters (higher = better accuracy, slower/more memory)
@@ -18,6 +25,20 @@ M: int = 8                  # Graph degree: average edges per node (suggested 4-
 EF_CONSTRUCTION: int = 200  # Build-time beam width: candidates explored per insert (suggested 50-200)
 EF_SEARCH: int = 200        # Search-time beam width: candidates explored per search (suggested 50-200)
 
+# Build parameters
+BUILD_CHUNK_SIZE: int = 10000   # Embeddings read, normalized and added per streaming step
+TRAIN_SIZE: int = 100000        # Embeddings sampled to train quantized indexes (unused by HNSWFlat)
+
+# Adaptive search parameters (enabled by ef_min; ef_search is then the widest beam)
+ADAPTIVE_GAP_RATIO: float = 0.5     # Widen when the k-th/(k+1)-th score gap is below this fraction of the mean top-k gap
+
+# Query execution parameters
+SEARCH_BATCH_SIZE: int = 1024   # Queries sent to FAISS per search call
+NUM_THREADS: int | None = None  # OpenMP threads used by FAISS (None = FAISS default, all cores)
+
+# Search-time parameters (excluded from build manifests)
+SEARCH_PARAMS: Tuple[str, ...] = ("ef_search", "nprobe", "ef_min", "latency_budget_ms")
+
 # Types
 RankedResults = List[Tuple[int, float]]
 QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
@@ -25,51 +46,184 @@ QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
 class HNSWSystem(SearchSystem):
     """Implements dense vector retrieval using FAISS HNSW index."""
 
-    def __init__(self) -> None:
-        super().__init__("HNSW")
-        self.index: faiss.IndexHNSWFlat | None = None
+    def __init__(
+        self,
+        m: int = M,
+        ef_construction: int = EF_CONSTRUCTION,
+        ef_search: int = EF_SEARCH,
+        batch_size: int = SEARCH_BATCH_SIZE,
+        num_threads: int | None = NUM_THREADS,
+        result_cache_mb: int | None = None,
+        name: str = "HNSW",
+        ef_min: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> None:
+        super().__init__(name)
+        self.index: faiss.Index | None = None
         self.doc_ids: np.ndarray | None = None
-    
-    def build(self) -> None:
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.result_cache_mb = result_cache_mb # on-disk result cache budget (None = disabled)
+        self.build_dir = os.path.join(ARTIFACTS_DIR, self.name.lower())
+        self.row_range: Tuple[int, int | None] = (0, None) # embedding rows indexed (shards index a sub-range)
+        self.ef_min = ef_min # adaptive search starting beam (None = every query uses ef_search)
+        self.latency_budget_ms = latency_budget_ms # per-query budget for widening the beam (None = unbounded)
+        self.ef_counts: Dict[int, int] = {} # efSearch -> queries answered at it (adaptive search)
+
+    def params(self) -> Dict[str, int | str | None]:
+        """Index and search parameters recorded alongside each run."""
+        params = {"m": self.m, "ef_construction": self.ef_construction, "ef_search": self.ef_search}
+        if self.ef_min is not None: params.update(ef_min=self.ef_min, latency_budget_ms=self.latency_budget_ms)
+        return params
+
+    def build_params(self) -> Dict[str, int | str | List | None]:
+        """Parameters that determine the built index (recorded in and checked against its manifest)."""
+        params = {name: value for name, value in self.params().items() if name not in SEARCH_PARAMS}
+        return {"index": type(self).__name__, **params, "rows": list(self.row_range)}
+
+    def create_index(self, dim: int) -> faiss.Index:
+        """Create the empty FAISS index (overridden by quantized variants)."""
+        index = faiss.IndexHNSWFlat(dim, self.m, faiss.METRIC_INNER_PRODUCT)
+
+        # Set build-time beam width
+        index.hnsw.efConstruction = self.ef_construction
+        return index
+
+    def configure_search(self) -> None:
+        """Apply search-time parameters to the loaded index."""
+        # Set search-time beam width
+        self.index.hnsw.efSearch = self.ef_search
+
+    def build(self, start: int = 0, stop: int | None = None, force: bool = False) -> None:
         """
-        Build FAISS HNSW index from document embeddings.
-        Outputs are stored under artifacts/hnsw/.
+        Build FAISS HNSW index by streaming document embeddings in chunks.
+        Outputs are stored under artifacts/<name>/, with a manifest; the build
+        is skipped when the manifest matches the current inputs and parameters.
+
+        Args:
+            start: First embedding row to index (shards index a row range).
+            stop: End of the row range (None = end of the collection).
+            force: Rebuild even if the existing artifacts are current.
         """
-        build_dir = os.path.join(ARTIFACTS_DIR, self.name.lower())
-        os.makedirs(build_dir, exist_ok=True)
-        index_path = os.path.join(build_dir, "index.faiss")
-        doc_ids_path = os.path.join(build_dir, "doc_ids.npy")
-
-        # Load document embeddings (doc_id -> doc_embedding)
-        print(f"[{self.name}] Loading document embeddings...")
-        doc_ids, doc_embeddings = load_h5_embeddings(SUBSET_EMBEDDINGS_PATH)
-
-        # Normalize so inner product behaves like cosine similarity
-        faiss.normalize_L2(doc_embeddings)
-        
-        # Initialize HNSW index
-        index = faiss.IndexHNSWFlat(
-            doc_embeddings.shape[1],
-            M,
-            faiss.METRIC_INNER_PRODUCT
-        )
-        
-        # Set build-time beam width
-        index.hnsw.efConstruction = EF_CONSTRUCTION
+        self.row_range = (start, stop)
+        inputs = {"embeddings": SUBSET_EMBEDDINGS_PATH}
+        if not force and not manifest_problems(self.build_dir, inputs, self.build_params(), self.artifact_paths()):
+            print(f"[{self.name}] Index is up to date with its inputs and parameters, skipping build (--force rebuilds)")
+            return
+
+        os.makedirs(self.build_dir, exist_ok=True)
+        index_path = os.path.join(self.build_dir, "index.faiss")
+        doc_ids_path = os.path.join(self.build_dir, "doc_ids.npy")
+
+        total_docs, dim = load_h5_shape(SUBSET_EMBEDDINGS_PATH)
+        stop = total_docs if stop is None else min(stop, total_docs)
+        num_docs = max(stop - start, 0)
+        index = self.create_index(dim)
+
+        # Quantized indexes learn their codebooks from a leading sample of the range
+        if not index.is_trained:
+            train_stop = min(start + TRAIN_SIZE, stop)
+            print(f"[{self.name}] Training index on {train_stop - start} embeddings...")
+            with stage("train"):
+                _, train_embeddings = next(iter_h5_embeddings(SUBSET_EMBEDDINGS_PATH, TRAIN_SIZE, start=start, stop=train_stop))
+                faiss.normalize_L2(train_embeddings)
+                index.train(train_embeddings)
+                del train_embeddings
+
+        # Stream embeddings chunk by chunk so only the graph and one chunk stay resident
+        print(f"[{self.name}] Streaming document embeddings...")
+        doc_id_chunks: List[np.ndarray] = []
+        chunk_rates: List[float] = []
+        with stage("add"), tqdm(total=num_docs, desc=f"[{self.name}] Building index", unit="embedding") as progress:
+            for chunk_ids, chunk_embeddings in iter_h5_embeddings(SUBSET_EMBEDDINGS_PATH, BUILD_CHUNK_SIZE, start=start, stop=stop):
+                chunk_start = time.perf_counter()
+
+                # Normalize so inner product behaves like cosine similarity
+                faiss.normalize_L2(chunk_embeddings)
+                index.add(chunk_embeddings)
+
+                chunk_rates.append(len(chunk_embeddings) / max(time.perf_counter() - chunk_start, 1e-9))
+                doc_id_chunks.append(chunk_ids)
+                progress.set_postfix(chunk_rate=f"{chunk_rates[-1]:.0f}/s")
+                progress.update(len(chunk_embeddings))
 
-        # Add embeddings in batches (for progress display)
-        batch_size = 10000
-        with tqdm(total=len(doc_embeddings), desc=f"[{self.name}] Building index", unit="embedding") as progress:
-            for start in range(0, len(doc_embeddings), batch_size):
-                end = min(start + batch_size, len(doc_embeddings))
-                index.add(doc_embeddings[start:end])
-                progress.update(end - start)
+        if chunk_rates:
+            print(
+                f"[{self.name}] Added {len(chunk_rates)} chunks: "
+                f"min={min(chunk_rates):.0f}/s, mean={sum(chunk_rates) / len(chunk_rates):.0f}/s, "
+                f"max={max(chunk_rates):.0f}/s"
+            )
+        doc_ids = np.concatenate(doc_id_chunks) if doc_id_chunks else np.array([], dtype=str)
 
-        # Save index and corresponding doc IDs
+        # Save index and corresponding doc IDs (int64, as ingest() writes them)
         self.index = index
-        self.doc_ids = doc_ids
-        faiss.write_index(index, index_path)
-        np.save(doc_ids_path, doc_ids)
+        self.doc_ids = doc_ids.astype(np.int64)
+        self.record_structures()
+        with stage("write"):
+            faiss.write_index(index, index_path)
+            np.save(doc_ids_path, self.doc_ids)
+        write_manifest(self.build_dir, inputs, self.build_params(), self.artifact_paths())
+        print(f"[{self.name}] Index size on disk: {os.path.getsize(index_path) / (1024 ** 2):.2f}MB")
+
+    def ingest(self, embeddings_path: str, indexed_doc_ids: np.ndarray | None = None) -> int:
+        """
+        Append new document embeddings to the built index without rebuilding it.
+
+        IDs already in the index are skipped (the graph is append-only). The
+        index and doc_ids.npy are rewritten through temporary files, doc IDs
+        first, so a concurrent load never sees an index longer than its IDs.
+
+        Args:
+            embeddings_path: HDF5 file with 'id' and 'embedding' datasets (same layout as the collection).
+            indexed_doc_ids: IDs to treat as already indexed (defaults to this index's doc IDs).
+
+        Returns:
+            Number of embeddings added.
+        """
+        self.load()
+        index_path = os.path.join(self.build_dir, "index.faiss")
+        doc_ids_path = os.path.join(self.build_dir, "doc_ids.npy")
+
+        known_doc_ids = np.sort(self.doc_ids if indexed_doc_ids is None else indexed_doc_ids)
+        added_ids: set = set()
+        doc_id_chunks: List[np.ndarray] = [self.doc_ids]
+        num_new, _ = load_h5_shape(embeddings_path)
+        with tqdm(total=num_new, desc=f"[{self.name}] Ingesting embeddings", unit="embedding") as progress:
+            for chunk_ids, chunk_embeddings in iter_h5_embeddings(embeddings_path, BUILD_CHUNK_SIZE):
+                chunk_doc_ids = chunk_ids.astype(np.int64)
+
+                # Skip IDs already indexed or repeated within this ingest
+                positions = np.minimum(np.searchsorted(known_doc_ids, chunk_doc_ids), max(len(known_doc_ids) - 1, 0))
+                indexed = known_doc_ids[positions] == chunk_doc_ids if len(known_doc_ids) else np.zeros(len(chunk_doc_ids), dtype=bool)
+                rows: List[int] = []
+                for row, doc_id in enumerate(chunk_doc_ids.tolist()):
+                    if indexed[row] or doc_id in added_ids: continue
+                    added_ids.add(doc_id)
+                    rows.append(row)
+
+                if rows:
+                    new_embeddings = np.ascontiguousarray(chunk_embeddings[rows])
+                    faiss.normalize_L2(new_embeddings)
+                    self.index.add(new_embeddings)
+                    doc_id_chunks.append(chunk_doc_ids[rows])
+                progress.update(len(chunk_ids))
+
+        skipped = num_new - len(added_ids)
+        print(f"[{self.name}] Added {len(added_ids)} embeddings, skipped {skipped} already indexed")
+        if not added_ids: return 0
+
+        self.doc_ids = np.concatenate(doc_id_chunks)
+        with open(f"{doc_ids_path}.tmp", "wb") as doc_ids_file: np.save(doc_ids_file, self.doc_ids)
+        faiss.write_index(self.index, f"{index_path}.tmp")
+        os.replace(f"{doc_ids_path}.tmp", doc_ids_path)
+        os.replace(f"{index_path}.tmp", index_path)
+        record_ingest(self.build_dir, {"embeddings": fingerprint_input(embeddings_path), "added": len(added_ids)}, self.artifact_paths())
+        print(f"[{self.name}] Index size on disk: {os.path.getsize(index_path) / (1024 ** 2):.2f}MB")
+
+        return len(added_ids)
 
     def search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> List[QueryResult]:
         """
@@ -82,61 +236,228 @@ class HNSWSystem(SearchSystem):
         Returns:
             A list of (query_id, ranked_results) pairs.
         """
-        build_dir = os.path.join(ARTIFACTS_DIR, self.name.lower())
-        index_path = os.path.join(build_dir, "index.faiss")
-        doc_ids_path = os.path.join(build_dir, "doc_ids.npy")
-
-        # Load index and doc IDs if not already in memory
-        if self.index is None or self.doc_ids is None:
-            print(f"[{self.name}] Loading index...")
-            self.index = faiss.read_index(index_path)
-            self.doc_ids = np.load(doc_ids_path, allow_pickle=True)
-
-        # Load and normalize query embeddings (must match index normalization)
-        print(f"[{self.name}] Loading query embeddings...")
-        query_ids, query_embeddings = load_h5_embeddings(QUERIES_EMBEDDINGS_PATH)
-        faiss.normalize_L2(query_embeddings)
-        query_map = dict(zip(query_ids, query_embeddings))
+        return list(self.iter_search(queries, top_k))
 
-        # Set search-time beam width
-        self.index.hnsw.efSearch = EF_SEARCH
+    def iter_search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> Iterator[QueryResult]:
+        """
+        Execute ANN retrieval, yielding (query_id, ranked_results) as each query batch completes.
+
+        Query embeddings are read one batch at a time, so memory stays flat
+        in the number of queries. With a result cache, only queries missing
+        from it are searched (and the index is not loaded if all hit).
+
+        Args:
+            queries: List of (query_id, query_text) pairs.
+            top_k: Number of top documents to retrieve per query.
+        """
+        if self.result_cache_mb is None:
+            yield from self._iter_search(queries, top_k)
+            return
+
+        params = {**self.params(), "top_k": top_k}
+        yield from iter_cached(
+            self.name, fingerprint_paths(self.artifact_paths()), params, queries,
+            partial(self._iter_search, top_k=top_k), self.result_cache_mb,
+        )
+
+    def _iter_search(self, queries: List[Tuple[str, str]], top_k: int) -> Iterator[QueryResult]:
+        """Search every query against the index (no result cache)."""
+        self.load()
+        self.prepare_search()
+        with stage("load queries"):
+            id_index = load_h5_id_index(QUERIES_EMBEDDINGS_PATH)
 
-        # Perform ANN search for each query
-        all_results: List[QueryResult] = []
         with tqdm(total=len(queries), desc=f"[{self.name}] Searching queries", unit="query") as progress:
-            for query_id, _ in queries:
-                query_embedding = query_map.get(query_id)
-                if query_embedding is None:
-                    progress.update(1)
-                    continue
-
-                scores, indices = self.index.search(query_embedding.reshape(1, -1), top_k)
-                ranked = [
-                    (int(self.doc_ids[i]), float(scores[0][j]))
-                    for j, i in enumerate(indices[0])
-                ]
-                all_results.append((query_id, ranked))
-                progress.update(1)
-
-        return all_results
-
-    def save_run(self, results: List[QueryResult], output_filename: str) -> None:
+            for start in range(0, len(queries), self.batch_size):
+                batch = queries[start:start + self.batch_size]
+
+                # Load and normalize only this batch's query embeddings (must match index normalization)
+                with stage("load queries"):
+                    query_ids, query_embeddings = load_h5_embeddings_by_id(
+                        QUERIES_EMBEDDINGS_PATH,
+                        (query_id for query_id, _ in batch),
+                        id_index=id_index,
+                    )
+                    faiss.normalize_L2(query_embeddings)
+
+                with stage("search"):
+                    start_time = time.perf_counter()
+                    results = self.search_batch(query_ids.tolist(), query_embeddings, top_k)
+                    record_latency(self.name, time.perf_counter() - start_time, len(results))
+
+                yield from results
+                progress.update(len(batch))
+
+        if self.ef_counts: print(f"[{self.name}] Adaptive efSearch: {self.ef_summary()}")
+
+    def load(self) -> None:
+        """Load the index and doc IDs if not already in memory (refused if its manifest is stale)."""
+        if self.index is not None and self.doc_ids is not None: return
+
+        verify_manifest(
+            self.name, self.build_dir, {"embeddings": SUBSET_EMBEDDINGS_PATH}, self.build_params(), self.artifact_paths()
+        )
+        print(f"[{self.name}] Loading index...")
+        with stage("load index"):
+            self.index = faiss.read_index(os.path.join(self.build_dir, "index.faiss"))
+            self.doc_ids = np.load(os.path.join(self.build_dir, "doc_ids.npy")).astype(np.int64, copy=False)
+        self.record_structures()
+
+    def structure_bytes(self) -> Dict[str, int]:
+        """In-memory size of the loaded index's parts: HNSW graph links, vector storage (codes) and doc IDs."""
+        hnsw = self.index.hnsw
+        graph_bytes = sum(faiss.vector_to_array(vector).nbytes for vector in (hnsw.neighbors, hnsw.offsets, hnsw.levels))
+        storage = faiss.downcast_index(self.index.storage)
+        return {
+            "graph": graph_bytes,
+            "vectors": storage.ntotal * storage.sa_code_size(),
+            "doc_ids": self.doc_ids.nbytes,
+        }
+
+    def record_structures(self) -> None:
+        """Report structure_bytes() to RSS tracking (see utils.performance.record_structure)."""
+        for structure, num_bytes in self.structure_bytes().items():
+            record_structure(self.name, structure, num_bytes)
+
+    def prepare_search(self) -> None:
+        """Apply thread count and search-time parameters before a batch of searches."""
+        if self.num_threads is not None:
+            faiss.omp_set_num_threads(self.num_threads)
+
+        self.configure_search()
+
+    def search_arrays(self, query_embeddings: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search one batch of normalized query embeddings with a single FAISS call.
+
+        Returns:
+            (scores, doc_ids) of shape (n, top_k), as inner products; doc_ids is -1 for missing hits.
+        """
+        batch = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+        scores, indices = self.index.search(batch, top_k)
+
+        # Some quantized indexes only support L2; on unit vectors ||q - d||^2 = 2 - 2 * <q, d>
+        if self.index.metric_type == faiss.METRIC_L2:
+            scores = 1.0 - scores / 2.0
+
+        # Map index positions to doc IDs for the whole batch
+        valid = indices >= 0
+        return scores, np.where(valid, self.doc_ids[np.where(valid, indices, 0)], -1)
+
+    def set_ef_search(self, ef_search: int) -> None:
+        """Set the search-time beam width of the loaded index (used by adaptive search)."""
+        self.index.hnsw.efSearch = ef_search
+
+    def search_arrays_adaptive(self, query_embeddings: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Save ranked retrieval results in plain tab-separated format.
+        Search with a per-query beam width: every query starts at ef_min, and only
+        unstable queries are searched again with a doubled efSearch (up to ef_search).
+
+        A query is unstable after the first pass if its k-th and (k+1)-th scores
+        are closer than ADAPTIVE_GAP_RATIO times its mean top-k score gap (or hits
+        are missing); after a wider pass, only if its top-k set changed, so
+        queries stop widening as soon as a wider beam finds nothing new. A query
+        also stops once its next pass (estimated at twice its last pass, per
+        query) would exceed latency_budget_ms.
+
+        Returns:
+            (scores, doc_ids) of shape (n, top_k), as in search_arrays.
+        """
+        num_queries = len(query_embeddings)
+        if not num_queries: return self.search_arrays(query_embeddings, top_k)
+
+        ef_search = min(self.ef_min, self.ef_search)
+        budget = None if self.latency_budget_ms is None else self.latency_budget_ms / 1000
+        elapsed = np.zeros(num_queries)
+        ef_used = np.full(num_queries, ef_search)
+        active = np.arange(num_queries)
+        scores: np.ndarray | None = None
+        doc_ids: np.ndarray | None = None
+
+        while True:
+            self.set_ef_search(ef_search)
+            start_time = time.perf_counter()
+            round_scores, round_doc_ids = self.search_arrays(query_embeddings[active], top_k + 1)
+            round_seconds = (time.perf_counter() - start_time) / len(active)
+            elapsed[active] += round_seconds
+
+            if scores is None:
+                scores, doc_ids = round_scores, round_doc_ids
+                # Boundary gap relative to the mean gap between consecutive top-k scores
+                valid = (round_doc_ids >= 0).all(axis=1)
+                with np.errstate(invalid="ignore"): # missing hits score -inf in merged shard results
+                    spread = np.where(valid, round_scores[:, 0] - round_scores[:, top_k], 0)
+                    gap = np.where(valid, round_scores[:, top_k - 1] - round_scores[:, top_k], 0)
+                unstable = ~valid | (gap < ADAPTIVE_GAP_RATIO * spread / top_k)
+            else:
+                previous = np.sort(doc_ids[active, :top_k], axis=1)
+                unstable = (np.sort(round_doc_ids[:, :top_k], axis=1) != previous).any(axis=1)
+                scores[active], doc_ids[active] = round_scores, round_doc_ids
+                ef_used[active] = ef_search
+
+            next_ef_search = min(ef_search * 2, self.ef_search)
+            if next_ef_search <= ef_search: break
+            if budget is not None: unstable &= elapsed[active] + 2 * round_seconds <= budget
+            active = active[unstable]
+            if not len(active): break
+            ef_search = next_ef_search
+
+        self.configure_search() # restore the fixed beam for non-adaptive callers
+        for value, count in zip(*np.unique(ef_used, return_counts=True)):
+            self.ef_counts[int(value)] = self.ef_counts.get(int(value), 0) + int(count)
+
+        return scores[:, :top_k], doc_ids[:, :top_k]
+
+    def ef_summary(self) -> str:
+        """efSearch distribution used by adaptive search so far."""
+        total = sum(self.ef_counts.values())
+        mean = sum(value * count for value, count in self.ef_counts.items()) / max(total, 1)
+        distribution = ", ".join(f"{value}: {count / total:.1%}" for value, count in sorted(self.ef_counts.items()))
+        return f"mean={mean:.1f} ({distribution})"
+
+    def search_batch(self, query_ids: List[str], query_embeddings: np.ndarray, top_k: int = 10) -> List[QueryResult]:
+        """Search one batch of normalized query embeddings, returning (query_id, ranked_results) pairs."""
+        if self.ef_min is not None: scores, doc_ids = self.search_arrays_adaptive(query_embeddings, top_k)
+        else: scores, doc_ids = self.search_arrays(query_embeddings, top_k)
+        valid = doc_ids >= 0
+        return [
+            (query_id, list(zip(doc_ids[row][valid[row]].tolist(), scores[row][valid[row]].tolist())))
+            for row, query_id in enumerate(query_ids)
+        ]
+
+    def artifact_paths(self) -> List[str]:
+        """Files the loaded index is read from (fingerprinted by the result cache)."""
+        return [os.path.join(self.build_dir, "index.faiss"), os.path.join(self.build_dir, "doc_ids.npy")]
+
+    def index_bytes(self) -> int | None:
+        """Size of the index on disk (None if not built)."""
+        index_path = os.path.join(self.build_dir, "index.faiss")
+        return os.path.getsize(index_path) if os.path.exists(index_path) else None
+
+    def save_run(self, results: Iterable[QueryResult], output_filename: str) -> None:
+        """
+        Save ranked retrieval results (plain tab-separated, or binary columnar for .npz filenames),
+        plus a `<filename>.stats.json` with index parameters, index size and memory.
 
         Args:
-            results: List of (query_id, ranked_results) pairs.
-            output_filename: Name of the output file (saved under runs/bm25/).
+            results: (query_id, ranked_results) pairs; a generator is written as it yields.
+            output_filename: Name of the output file (saved under runs/<name>/).
         """
         output_dir = os.path.join(RUNS_DIR, self.name.lower())
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, output_filename)
-        
-        with open(output_path, "w", encoding="utf-8") as output_file:
-            with tqdm(total=len(results), desc=f"[{self.name}] Saving results", unit="query") as progress:
-                for query_id, ranked_docs in results:
-                    for rank, (doc_id, score) in enumerate(ranked_docs, start=1):
-                        # Columns: query_id, doc_id, rank, score
-                        output_file.write(f"{query_id}\t{doc_id}\t{rank}\t{score:.6f}\n")
-                    
-                    progress.update(1)
\ No newline at end of file
+
+        write_run(results, output_path, desc=f"[{self.name}] Saving results")
+
+        # Record index footprint next to the run
+        rss, peak_rss = get_memory_usage()
+        stats = {
+            "system": self.name,
+            "params": self.params(),
+            "index_bytes": self.index_bytes(),
+            "rss_bytes": rss,
+            "peak_rss_bytes": peak_rss,
+        }
+        if self.ef_counts: stats["ef_search_used"] = {str(value): count for value, count in sorted(self.ef_counts.items())}
+        with open(f"{output_path}.stats.json", "w", encoding="utf-8") as stats_file:
+            json.dump(stats, stats_file, indent=2)
@@ -0,0 +1,113 @@
+"""
+Compressed dense search systems using FAISS (HNSW+SQ, HNSW+PQ, IVF-PQ).
+"""
+
+from typing import Dict
+
+import faiss
+
+from systems.hnsw import HNSWSystem, M, EF_CONSTRUCTION, EF_SEARCH, SEARCH_BATCH_SIZE, NUM_THREADS
+
+# Quantization parameters (smaller codes = less memory, lower accuracy)
+SQ_TYPE: str = "SQ8"    # Scalar quantizer: 8 bits per dimension (4x smaller than float32)
+PQ_M: int = 16          # Product quantizer sub-vectors per embedding (must divide the dimension)
+PQ_NBITS: int = 8       # Bits per sub-vector code
+NLIST: int = 1024       # IVF coarse clusters
+NPROBE: int = 16        # IVF clusters visited per search
+
+class HNSWSQSystem(HNSWSystem):
+    """HNSW graph over scalar-quantized vectors."""
+
+    def __init__(
+        self,
+        m: int = M,
+        ef_construction: int = EF_CONSTRUCTION,
+        ef_search: int = EF_SEARCH,
+        sq_type: str = SQ_TYPE,
+        batch_size: int = SEARCH_BATCH_SIZE,
+        num_threads: int | None = NUM_THREADS,
+        result_cache_mb: int | None = None,
+        ef_min: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> None:
+        super().__init__(
+            m, ef_construction, ef_search, batch_size, num_threads, result_cache_mb, "HNSW-SQ", ef_min, latency_budget_ms
+        )
+        self.sq_type = sq_type
+
+    def params(self) -> Dict[str, int | str | None]:
+        return {**super().params(), "sq_type": self.sq_type}
+
+    def create_index(self, dim: int) -> faiss.Index:
+        index = faiss.index_factory(dim, f"HNSW{self.m}_{self.sq_type}", faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        return index
+
+class HNSWPQSystem(HNSWSystem):
+    """HNSW graph over product-quantized vectors (FAISS only supports L2 here)."""
+
+    def __init__(
+        self,
+        m: int = M,
+        ef_construction: int = EF_CONSTRUCTION,
+        ef_search: int = EF_SEARCH,
+        pq_m: int = PQ_M,
+        pq_nbits: int = PQ_NBITS,
+        batch_size: int = SEARCH_BATCH_SIZE,
+        num_threads: int | None = NUM_THREADS,
+        result_cache_mb: int | None = None,
+        ef_min: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> None:
+        super().__init__(
+            m, ef_construction, ef_search, batch_size, num_threads, result_cache_mb, "HNSW-PQ", ef_min, latency_budget_ms
+        )
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+
+    def params(self) -> Dict[str, int | str | None]:
+        return {**super().params(), "pq_m": self.pq_m, "pq_nbits": self.pq_nbits}
+
+    def create_index(self, dim: int) -> faiss.Index:
+        # L2 ranking equals inner product ranking on normalized vectors
+        index = faiss.index_factory(dim, f"HNSW{self.m}_PQ{self.pq_m}x{self.pq_nbits}", faiss.METRIC_L2)
+        index.hnsw.efConstruction = self.ef_construction
+        return index
+
+class IVFPQSystem(HNSWSystem):
+    """Inverted file index over product-quantized vectors (no graph)."""
+
+    def __init__(
+        self,
+        nlist: int = NLIST,
+        nprobe: int = NPROBE,
+        pq_m: int = PQ_M,
+        pq_nbits: int = PQ_NBITS,
+        batch_size: int = SEARCH_BATCH_SIZE,
+        num_threads: int | None = NUM_THREADS,
+        result_cache_mb: int | None = None,
+    ) -> None:
+        super().__init__(batch_size=batch_size, num_threads=num_threads, result_cache_mb=result_cache_mb, name="IVF-PQ")
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_nbits = pq_nbits
+
+    def params(self) -> Dict[str, int | str | None]:
+        return {"nlist": self.nlist, "nprobe": self.nprobe, "pq_m": self.pq_m, "pq_nbits": self.pq_nbits}
+
+    def create_index(self, dim: int) -> faiss.Index:
+        return faiss.index_factory(dim, f"IVF{self.nlist},PQ{self.pq_m}x{self.pq_nbits}", faiss.METRIC_INNER_PRODUCT)
+
+    def structure_bytes(self) -> Dict[str, int]:
+        """Inverted lists (PQ codes plus 8-byte IDs), coarse centroids and doc IDs (there is no graph)."""
+        ivf = faiss.extract_index_ivf(self.index)
+        return {
+            "inverted_lists": ivf.ntotal * (ivf.code_size + 8),
+            "centroids": ivf.nlist * ivf.d * 4,
+            "doc_ids": self.doc_ids.nbytes,
+        }
+
+    def configure_search(self) -> None:
+        # Set number of coarse clusters scanned per query
+        faiss.extract_index_ivf(self.index).nprobe = self.nprobe
@@ -0,0 +1,176 @@
+"""
+Sharded HNSW search system: independent per-shard FAISS indexes built in parallel processes.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from systems.hnsw import HNSWSystem, M, EF_CONSTRUCTION, EF_SEARCH, SEARCH_BATCH_SIZE, NUM_THREADS
+from utils.loaders import load_h5_shape
+from utils.manifest import content_hash
+from utils.config import SUBSET_EMBEDDINGS_PATH
+
+# Sharding parameters
+NUM_SHARDS: int = 4                     # Contiguous row ranges of the collection, one index each
+NUM_BUILD_WORKERS: int | None = None    # Shard build processes (None = one per shard, capped at CPU count)
+
+def shard_ranges(num_docs: int, num_shards: int) -> List[Tuple[int, int]]:
+    """Split rows [0, num_docs) into num_shards contiguous, near-equal (start, stop) ranges."""
+    bounds = np.linspace(0, num_docs, num_shards + 1).astype(np.int64).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _build_shard(task: Tuple[Dict, str, int, int, int, bool]) -> Tuple[int, float]:
+    """Build one shard index in a worker process (skipped if current); returns (shard size, index bytes)."""
+    config, shard_dir, start, stop, num_threads, force = task
+    faiss.omp_set_num_threads(num_threads) # split cores between concurrent shard builds
+
+    shard = HNSWSystem(config["m"], config["ef_construction"], name=config["name"])
+    shard.build_dir = shard_dir
+    shard.build(start, stop, force)
+    return stop - start, shard.index_bytes()
+
+class ShardedHNSWSystem(HNSWSystem):
+    """
+    Partitions the collection into row-range shards, each a standalone HNSW index
+    under artifacts/hnsw-sharded/shard_<i>/.
+
+    `shard_ids` selects which shards this process builds or loads, so several
+    processes (or machines) can each own a subset; searches fan out across the
+    loaded shards in threads (FAISS releases the GIL) and merge per-query top-k.
+    """
+
+    def __init__(
+        self,
+        num_shards: int = NUM_SHARDS,
+        shard_ids: List[int] | None = None,
+        m: int = M,
+        ef_construction: int = EF_CONSTRUCTION,
+        ef_search: int = EF_SEARCH,
+        batch_size: int = SEARCH_BATCH_SIZE,
+        num_threads: int | None = NUM_THREADS,
+        num_workers: int | None = NUM_BUILD_WORKERS,
+        result_cache_mb: int | None = None,
+        ef_min: int | None = None,
+        latency_budget_ms: float | None = None,
+    ) -> None:
+        super().__init__(
+            m, ef_construction, ef_search, batch_size, num_threads, result_cache_mb, "HNSW-Sharded", ef_min, latency_budget_ms
+        )
+        self.num_shards = num_shards
+        self.shard_ids = sorted(shard_ids) if shard_ids is not None else list(range(num_shards))
+        self.num_workers = num_workers
+        self.shards: List[HNSWSystem] = []
+
+        invalid = [shard_id for shard_id in self.shard_ids if not 0 <= shard_id < num_shards]
+        if invalid: raise ValueError(f"Shard ids {invalid} out of range for {num_shards} shards.")
+
+    def params(self) -> Dict[str, int | str | None]:
+        return {**super().params(), "num_shards": self.num_shards, "shard_ids": ",".join(map(str, self.shard_ids))}
+
+    def shard_dir(self, shard_id: int) -> str:
+        return os.path.join(self.build_dir, f"shard_{shard_id}")
+
+    def build(self, force: bool = False) -> None:
+        """
+        Build the selected shards in parallel worker processes (shards whose manifest is current are skipped).
+        Outputs are stored under artifacts/hnsw-sharded/shard_<i>/, plus shards.json.
+        """
+        os.makedirs(self.build_dir, exist_ok=True)
+        content_hash(SUBSET_EMBEDDINGS_PATH) # hash the input once here rather than in every worker
+        num_docs, _ = load_h5_shape(SUBSET_EMBEDDINGS_PATH)
+        ranges = shard_ranges(num_docs, self.num_shards)
+
+        num_workers = self.num_workers or min(len(self.shard_ids), os.cpu_count() or 1)
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+        tasks = [
+            (
+                {"m": self.m, "ef_construction": self.ef_construction, "name": f"{self.name}:{shard_id}"},
+                self.shard_dir(shard_id), *ranges[shard_id], threads_per_worker, force,
+            )
+            for shard_id in self.shard_ids
+        ]
+
+        print(f"[{self.name}] Building {len(tasks)} of {self.num_shards} shards on {num_workers} processes...")
+        with Pool(num_workers) as pool:
+            built = pool.map(_build_shard, tasks)
+
+        for shard_id, (size, index_bytes) in zip(self.shard_ids, built):
+            print(f"[{self.name}] Shard {shard_id}: {size} embeddings, {index_bytes / (1024 ** 2):.2f}MB")
+
+        # Record the partitioning so shards can be located and validated independently
+        with open(os.path.join(self.build_dir, "shards.json"), "w", encoding="utf-8") as layout_file:
+            json.dump({"num_shards": self.num_shards, "ranges": ranges}, layout_file, indent=2)
+
+    def load(self) -> None:
+        """Load the selected shards if not already in memory."""
+        if self.shards: return
+
+        layout_path = os.path.join(self.build_dir, "shards.json")
+        with open(layout_path, "r", encoding="utf-8") as layout_file:
+            layout = json.load(layout_file)
+        if layout["num_shards"] != self.num_shards:
+            raise ValueError(f"Index was built with {layout['num_shards']} shards, not {self.num_shards}.")
+
+        print(f"[{self.name}] Loading shards {self.shard_ids}...")
+        for shard_id in self.shard_ids:
+            shard = HNSWSystem(self.m, self.ef_construction, self.ef_search, name=f"{self.name}:{shard_id}")
+            shard.build_dir = self.shard_dir(shard_id)
+            shard.row_range = tuple(layout["ranges"][shard_id]) # checked against the shard's manifest
+            shard.load()
+            self.shards.append(shard)
+
+    def ingest(self, embeddings_path: str) -> int:
+        """
+        Append new embeddings to the last selected shard (shards.json keeps the original row ranges).
+        IDs already in any loaded shard are skipped.
+        """
+        self.load()
+        indexed_doc_ids = np.concatenate([shard.doc_ids for shard in self.shards])
+        return self.shards[-1].ingest(embeddings_path, indexed_doc_ids)
+
+    def configure_search(self) -> None:
+        for shard in self.shards:
+            shard.configure_search()
+
+    def set_ef_search(self, ef_search: int) -> None:
+        for shard in self.shards:
+            shard.set_ef_search(ef_search)
+
+    def search_arrays(self, query_embeddings: np.ndarray, top_k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Search every loaded shard concurrently and merge to the global top_k per query.
+        The OpenMP thread budget (num_threads, or FAISS's current maximum) is split across
+        the shard threads so concurrent searches do not oversubscribe the cores.
+        """
+        threads_per_shard = max(1, (self.num_threads or faiss.omp_get_max_threads()) // len(self.shards))
+
+        def search_shard(shard: HNSWSystem) -> Tuple[np.ndarray, np.ndarray]:
+            faiss.omp_set_num_threads(threads_per_shard) # applies to OpenMP regions started from this thread
+            return shard.search_arrays(query_embeddings, top_k)
+
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as executor:
+            shard_results = list(executor.map(search_shard, self.shards))
+
+        scores = np.concatenate([scores for scores, _ in shard_results], axis=1)
+        doc_ids = np.concatenate([doc_ids for _, doc_ids in shard_results], axis=1)
+        scores = np.where(doc_ids >= 0, scores, -np.inf) # missing hits sort last
+
+        best = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(scores, best, axis=1), np.take_along_axis(doc_ids, best, axis=1)
+
+    def artifact_paths(self) -> List[str]:
+        return [path for shard_id in self.shard_ids for path in (
+            os.path.join(self.shard_dir(shard_id), "index.faiss"),
+            os.path.join(self.shard_dir(shard_id), "doc_ids.npy"),
+        )]
+
+    def index_bytes(self) -> int | None:
+        index_paths = [path for path in self.artifact_paths() if path.endswith(".faiss")]
+        if not all(os.path.exists(path) for path in index_paths): return None
+        return sum(os.path.getsize(path) for path in index_paths)
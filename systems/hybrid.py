@@ -0,0 +1,140 @@
+"""
+Hybrid search system: BM25 and HNSW run concurrently and are fused in memory.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from systems.base import SearchSystem
+from systems.bm25 import BM25System, NUM_WORKERS, LIST_CACHE_MB, LIST_CACHE_POLICY
+from systems.hnsw import HNSWSystem, EF_SEARCH, SEARCH_BATCH_SIZE, NUM_THREADS
+from systems.rerank_rrf import reciprocal_rank_fusion
+from systems.rerank_linear import linear_score_fusion
+from utils.performance import stage
+from utils.writers import write_run
+from utils.config import RUNS_DIR
+
+# Fusion parameters
+FUSION: str = "rrf"     # "rrf" (rank-based) or "linear" (score-based)
+RRF_K: int = 60         # RRF rank smoothing constant
+ALPHA: float = 0.6      # Linear fusion weight on BM25
+CANDIDATES: int = 100   # Results retrieved from each leg before fusion
+
+# Types
+RankedResults = List[Tuple[str, float]]
+QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
+
+class HybridSystem(SearchSystem):
+    """Runs BM25 and HNSW legs concurrently over loaded indexes and fuses their results."""
+
+    def __init__(
+        self,
+        fusion: str = FUSION,
+        rrf_k: int = RRF_K,
+        alpha: float = ALPHA,
+        candidates: int = CANDIDATES,
+        num_workers: int = NUM_WORKERS,
+        list_cache_mb: int = LIST_CACHE_MB,
+        list_cache_policy: str = LIST_CACHE_POLICY,
+        ef_search: int = EF_SEARCH,
+        batch_size: int = SEARCH_BATCH_SIZE,
+        num_threads: int | None = NUM_THREADS,
+        result_cache_mb: int | None = None,
+    ) -> None:
+        super().__init__("Hybrid")
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.alpha = alpha
+        self.candidates = candidates
+        # Legs share the result cache with standalone bm25/hnsw runs (same system names and params)
+        self.bm25 = BM25System(num_workers, list_cache_mb, list_cache_policy, result_cache_mb)
+        self.hnsw = HNSWSystem(
+            ef_search=ef_search, batch_size=batch_size, num_threads=num_threads, result_cache_mb=result_cache_mb
+        )
+
+    def build(self, force: bool = False) -> None:
+        """Build both underlying indexes (each skipped if already current)."""
+        self.bm25.build(force=force)
+        self.hnsw.build(force=force)
+
+    def ingest(self, passages_path: str, embeddings_path: str, merge_threshold: int | None = None) -> None:
+        """Add new passages to both legs (BM25 delta segment and HNSW index)."""
+        self.bm25.ingest(passages_path, merge_threshold)
+        self.hnsw.ingest(embeddings_path)
+
+    def search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> List[QueryResult]:
+        """
+        Execute the BM25 and HNSW legs concurrently, then fuse per query.
+
+        FAISS releases the GIL while searching, so the dense leg overlaps
+        with BM25 even when BM25 runs in this process.
+
+        Args:
+            queries: List of (query_id, query_text) pairs.
+            top_k: Number of fused documents to return per query.
+
+        Returns:
+            A list of (query_id, ranked_results) pairs.
+        """
+        candidates = max(self.candidates, top_k)
+
+        def timed(system: SearchSystem) -> Tuple[List, float]:
+            start_time = time.perf_counter()
+            results = system.search(queries, top_k=candidates)
+            return results, time.perf_counter() - start_time
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            bm25_future = executor.submit(timed, self.bm25)
+            hnsw_future = executor.submit(timed, self.hnsw)
+            bm25_results, bm25_time = bm25_future.result()
+            hnsw_results, hnsw_time = hnsw_future.result()
+
+        start_time = time.perf_counter()
+        with stage("fuse"):
+            fused = self.fuse(bm25_results, hnsw_results, top_k)
+        fusion_time = time.perf_counter() - start_time
+
+        print(f"[{self.name}] BM25={bm25_time:.3f}s, HNSW={hnsw_time:.3f}s, Fusion({self.fusion})={fusion_time:.3f}s")
+
+        # Keep input query order (fusion iterates a set)
+        fused_map = dict(fused)
+        return [(query_id, fused_map[query_id]) for query_id, _ in queries if query_id in fused_map]
+
+    def fuse(self, bm25_results: List, hnsw_results: List, top_k: int, show_progress: bool = True) -> List[QueryResult]:
+        """Fuse BM25 and HNSW (query_id, ranked_results) lists with the configured fusion method."""
+        if self.fusion == "linear":
+            return linear_score_fusion(
+                self.to_scores(bm25_results), self.to_scores(hnsw_results), self.alpha, top_k, show_progress
+            )
+        return reciprocal_rank_fusion(
+            self.to_ranks(bm25_results), self.to_ranks(hnsw_results), self.rrf_k, top_k, show_progress
+        )
+
+    @staticmethod
+    def to_scores(results: List) -> Dict[str, Dict[str, float]]:
+        """Convert (query_id, [(doc_id, score), ...]) results to {query_id: {doc_id: score}}."""
+        return {query_id: {str(doc_id): score for doc_id, score in ranked} for query_id, ranked in results}
+
+    @staticmethod
+    def to_ranks(results: List) -> Dict[str, Dict[str, int]]:
+        """Convert (query_id, [(doc_id, score), ...]) results to {query_id: {doc_id: rank}}."""
+        return {
+            query_id: {str(doc_id): rank for rank, (doc_id, _) in enumerate(ranked, start=1)}
+            for query_id, ranked in results
+        }
+
+    def save_run(self, results: List[QueryResult], output_filename: str) -> None:
+        """
+        Save ranked retrieval results (plain tab-separated, or binary columnar for .npz filenames).
+
+        Args:
+            results: List of (query_id, ranked_results) pairs.
+            output_filename: Name of the output file (saved under runs/hybrid/).
+        """
+        output_dir = os.path.join(RUNS_DIR, self.name.lower())
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, output_filename)
+
+        write_run(results, output_path, desc=f"[{self.name}] Saving results")
@@ -0,0 +1,26 @@
+"""
+Registry of search systems, resolved lazily so entry points only import what they run.
+"""
+
+import importlib
+from typing import Dict, Type
+
+# System name -> "module:Class" (importing a system pulls in faiss, h5py or search_system)
+SYSTEMS: Dict[str, str] = {
+    "bm25": "systems.bm25:BM25System",
+    "hnsw": "systems.hnsw:HNSWSystem",
+    "hnsw-sq": "systems.hnsw_quantized:HNSWSQSystem",
+    "hnsw-pq": "systems.hnsw_quantized:HNSWPQSystem",
+    "ivf-pq": "systems.hnsw_quantized:IVFPQSystem",
+    "hnsw-sharded": "systems.hnsw_sharded:ShardedHNSWSystem",
+    "flat": "systems.flat:FlatSystem",
+    "hybrid": "systems.hybrid:HybridSystem",
+    "rerank-rrf": "systems.rerank_rrf:RecipricalRankFusion",
+    "rerank-lsf": "systems.rerank_linear:LinearScoreFusion",
+    "rerank-dense": "systems.rerank_dense:DenseRerankSystem",
+}
+
+def load_system_class(name: str) -> Type:
+    """Import and return the class registered under name."""
+    module_name, class_name = SYSTEMS[name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
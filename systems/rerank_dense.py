@@ -0,0 +1,180 @@
+"""
+Cascade reranker: BM25 candidates re-scored with exact dense inner products.
+"""
+
+import os
+import time
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from systems.base import SearchSystem
+from systems.bm25 import BM25System, NUM_WORKERS, LIST_CACHE_MB, LIST_CACHE_POLICY
+from systems.flat import FlatSystem, normalize_rows
+from utils.loaders import load_h5_id_index, load_h5_embeddings_by_id
+from utils.performance import record_latency, stage
+from utils.writers import write_run
+from utils.config import QUERIES_EMBEDDINGS_PATH, RUNS_DIR
+
+# Cascade parameters
+CANDIDATES: int = 200       # BM25 results re-scored per query
+ALPHA: float = 0.3          # Weight on normalized BM25 score (dense gets 1 - alpha)
+QUERY_BATCH_SIZE: int = 256 # Query embeddings read from HDF5 at a time
+
+# Types
+RankedResults = List[Tuple[int, float]]
+QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
+
+def min_max_normalize(scores: np.ndarray) -> np.ndarray:
+    """Scale scores to [0, 1] (all zeros when every score is equal)."""
+    if not len(scores): return scores
+    low, high = scores.min(), scores.max()
+    if high <= low: return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+class DenseRerankSystem(SearchSystem):
+    """
+    Re-scores BM25's top candidates against the memory-mapped flat embedding store.
+
+    Per query, candidate vectors are gathered from artifacts/flat/ through a
+    doc_id -> row lookup and scored with one matmul, so the dense leg costs a
+    few hundred dot products instead of an ANN search.
+    """
+
+    def __init__(
+        self,
+        alpha: float = ALPHA,
+        candidates: int = CANDIDATES,
+        batch_size: int = QUERY_BATCH_SIZE,
+        num_workers: int = NUM_WORKERS,
+        list_cache_mb: int = LIST_CACHE_MB,
+        list_cache_policy: str = LIST_CACHE_POLICY,
+        result_cache_mb: int | None = None,
+    ) -> None:
+        super().__init__("ReRank-Dense")
+        self.alpha = alpha
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.bm25 = BM25System(num_workers, list_cache_mb, list_cache_policy, result_cache_mb)
+        self.store = FlatSystem()
+        self.sorted_doc_ids: np.ndarray | None = None
+        self.sorted_rows: np.ndarray | None = None
+
+    def build(self, force: bool = False) -> None:
+        """Build the BM25 index and the flat embedding store (each skipped if already current)."""
+        self.bm25.build(force=force)
+        self.store.build(force=force)
+
+    def load(self) -> None:
+        """Memory-map the embedding store and build its doc_id -> row lookup."""
+        self.store.load()
+        if self.sorted_doc_ids is not None: return
+
+        with stage("load index"):
+            self.sorted_rows = np.argsort(self.store.doc_ids, kind="stable")
+            self.sorted_doc_ids = self.store.doc_ids[self.sorted_rows]
+
+    def lookup_rows(self, doc_ids: np.ndarray) -> np.ndarray:
+        """Map doc IDs to embedding store rows (-1 for IDs not in the store)."""
+        if len(self.sorted_doc_ids) == 0: return np.full(len(doc_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.sorted_doc_ids, doc_ids), len(self.sorted_doc_ids) - 1)
+        found = self.sorted_doc_ids[positions] == doc_ids
+        return np.where(found, self.sorted_rows[positions], -1)
+
+    def rescore(self, query_embedding: np.ndarray, ranked: RankedResults, top_k: int) -> RankedResults:
+        """
+        Combine normalized BM25 and dense scores for one query's candidates.
+
+        Args:
+            query_embedding: Normalized float32 vector of shape (d,).
+            ranked: BM25 (doc_id, score) candidates.
+            top_k: Number of results to keep.
+        """
+        if not ranked: return []
+
+        doc_ids = np.fromiter((int(doc_id) for doc_id, _ in ranked), dtype=np.int64, count=len(ranked))
+        bm25_scores = np.fromiter((score for _, score in ranked), dtype=np.float64, count=len(ranked))
+
+        # Gather candidate vectors in row order (sequential reads from the memory map), then one matmul
+        rows = self.lookup_rows(doc_ids)
+        found = np.flatnonzero(rows >= 0)
+        if len(found) == 0: return ranked[:top_k] # no stored vectors: keep the BM25 ranking
+        order = np.argsort(rows[found])
+        dense_scores = np.zeros(len(ranked), dtype=np.float64)
+        dense_scores[found[order]] = self.store.embeddings[rows[found[order]]] @ query_embedding
+
+        # Candidates missing from the store get the lowest dense score
+        dense_norm = np.zeros(len(ranked), dtype=np.float64)
+        dense_norm[found] = min_max_normalize(dense_scores[found])
+        combined = self.alpha * min_max_normalize(bm25_scores) + (1 - self.alpha) * dense_norm
+
+        best = np.argsort(-combined, kind="stable")[:top_k]
+        return list(zip(doc_ids[best].tolist(), combined[best].tolist()))
+
+    def search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> List[QueryResult]:
+        """
+        Execute BM25 retrieval, then re-score its candidates densely.
+
+        Args:
+            queries: List of (query_id, query_text) pairs.
+            top_k: Number of re-ranked documents to return per query.
+
+        Returns:
+            A list of (query_id, ranked_results) pairs.
+        """
+        return list(self.iter_search(queries, top_k))
+
+    def iter_search(self, queries: List[Tuple[str, str]], top_k: int = 10) -> Iterator[QueryResult]:
+        """
+        Yield re-ranked (query_id, ranked_results) as BM25 candidates arrive, one query batch at a time.
+        Queries without an embedding keep their BM25 ranking.
+        """
+        self.load()
+        with stage("load queries"):
+            id_index = load_h5_id_index(QUERIES_EMBEDDINGS_PATH)
+        candidates = max(self.candidates, top_k)
+
+        batch: List[QueryResult] = []
+        for result in self.bm25.iter_search(queries, top_k=candidates):
+            batch.append(result)
+            if len(batch) == self.batch_size:
+                yield from self.rescore_batch(batch, top_k, id_index)
+                batch = []
+        if batch: yield from self.rescore_batch(batch, top_k, id_index)
+
+    def rescore_batch(self, batch: List[QueryResult], top_k: int, id_index: Tuple[np.ndarray, np.ndarray]) -> Iterator[QueryResult]:
+        """Load one batch of query embeddings and re-score each query's candidates (rescore latency is recorded per query)."""
+        with stage("load queries"):
+            query_ids, query_embeddings = load_h5_embeddings_by_id(
+                QUERIES_EMBEDDINGS_PATH,
+                (query_id for query_id, _ in batch),
+                id_index=id_index,
+            )
+            normalize_rows(query_embeddings)
+        embedding_rows = {query_id: row for row, query_id in enumerate(query_ids.tolist())}
+
+        for query_id, ranked in batch:
+            row = embedding_rows.get(query_id)
+            if row is None:
+                yield query_id, ranked[:top_k]
+                continue
+
+            with stage("fuse"):
+                start_time = time.perf_counter()
+                reranked = self.rescore(query_embeddings[row], ranked, top_k)
+                record_latency(self.name, time.perf_counter() - start_time)
+            yield query_id, reranked
+
+    def save_run(self, results: Iterable[QueryResult], output_filename: str) -> None:
+        """
+        Save ranked retrieval results (plain tab-separated, or binary columnar for .npz filenames).
+
+        Args:
+            results: (query_id, ranked_results) pairs; a generator is written as it yields.
+            output_filename: Name of the output file (saved under runs/rerank-dense/).
+        """
+        output_dir = os.path.join(RUNS_DIR, self.name.lower())
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, output_filename)
+
+        write_run(results, output_path, desc=f"[{self.name}] Saving results")
@@ -4,19 +4,51 @@ Linear Combination Reranker System
 
 import os
 from collections import defaultdict
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 from tqdm import tqdm
 
 from systems.base import SearchSystem
 from utils.loaders import load_run
+from utils.performance import stage
+from utils.writers import write_run
 from utils.config import RUNS_BM25_DIR, RUNS_HNSW_DIR, RUNS_RERANK_LCF_DIR
 
+def linear_score_fusion(
+    bm25: Dict[str, Dict[str, float]],
+    hnsw: Dict[str, Dict[str, float]],
+    alpha: float = 0.6,
+    top_k: int = 100,
+    show_progress: bool = True,
+) -> List[Tuple[str, List[Tuple[str, float]]]]:
+    """
+    Fuse two in-memory runs of {query_id: {doc_id: score}} as alpha * bm25 + (1 - alpha) * hnsw.
+    Docs missing from one run score 0.0 for that run.
+    """
+    fused_results = []
+    all_queries = set(bm25.keys()) | set(hnsw.keys())
+
+    for qid in tqdm(all_queries, desc="[ReRankTwo] Fusing", unit="query", disable=not show_progress):
+        scores = defaultdict(float)
+        bm25_docs = bm25.get(qid, {})
+        hnsw_docs = hnsw.get(qid, {})
+        all_docs = set(bm25_docs) | set(hnsw_docs)
+
+        for pid in all_docs:
+            b = bm25_docs.get(pid, 0.0)
+            h = hnsw_docs.get(pid, 0.0)
+            scores[pid] = alpha * b + (1 - alpha) * h
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        fused_results.append((qid, ranked))
+
+    return fused_results
+
 class LinearScoreFusion(SearchSystem):
     def __init__(self, alpha: float = 0.6):
         super().__init__("ReRankTwo")
         self.alpha = alpha
 
-    def build(self):
+    def build(self, force: bool = False):
         print("[ReRankTwo] No build step required.")
 
     def search(self, bm25_filename: str, hnsw_filename: str, top_k: int = 100):
@@ -26,23 +58,12 @@ class LinearScoreFusion(SearchSystem):
         print(f"[ReRankTwo] Loading BM25: {bm25_path}")
         print(f"[ReRankTwo] Loading HNSW: {hnsw_path}")
 
-        bm25 = load_run(bm25_path)
-        hnsw = load_run(hnsw_path)
-
-        fused_results = []
-        all_queries = set(bm25.keys()) | set(hnsw.keys())
-
-        for qid in tqdm(all_queries, desc="[ReRankTwo] Fusing", unit="query"):
-            scores = defaultdict(float)
-            all_docs = set(bm25.get(qid, {})) | set(hnsw.get(qid, {}))
-
-            for pid in all_docs:
-                b = bm25[qid].get(pid, 0.0)
-                h = hnsw[qid].get(pid, 0.0)
-                scores[pid] = self.alpha * b + (1 - self.alpha) * h
+        with stage("load runs"):
+            bm25 = load_run(bm25_path)
+            hnsw = load_run(hnsw_path)
 
-            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
-            fused_results.append((qid, ranked))
+        with stage("fuse"):
+            fused_results = linear_score_fusion(bm25, hnsw, alpha=self.alpha, top_k=top_k)
 
         print("[ReRankTwo] Fusion complete.")
         return fused_results
@@ -51,11 +72,6 @@ class LinearScoreFusion(SearchSystem):
         os.makedirs(RUNS_RERANK_LCF_DIR, exist_ok=True)
         output_path = os.path.join(RUNS_RERANK_LCF_DIR, output_filename)
 
-        with open(output_path, "w", encoding="utf-8") as f:
-            with tqdm(total=len(results), desc=f"[{self.name}] Saving", unit="query") as pbar:
-                for qid, ranked_docs in results:
-                    for rank, (pid, score) in enumerate(ranked_docs, start=1):
-                        f.write(f"{qid}\t{pid}\t{rank}\t{score:.6f}\n")
-                    pbar.update(1)
+        write_run(results, output_path, desc=f"[{self.name}] Saving")
 
         print(f"[ReRankTwo] Saved run to {output_path}")
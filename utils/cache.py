@@ -0,0 +1,189 @@
+"""
+Persistent on-disk cache of per-query search results (SQLite).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from utils.config import RESULT_CACHE_PATH
+
+# Cache parameters
+RESULT_CACHE_MB: int = 1024     # On-disk budget for cached results
+COMMIT_EVERY: int = 1000        # Writes between commits (bounds lock time and lost work)
+
+# Types
+RankedResults = List[Tuple[int | str, float]]
+QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
+
+def fingerprint_paths(paths: Iterable[str]) -> str:
+    """
+    Cheap fingerprint of build artifacts: name, size and mtime of every file
+    (directories are walked), so any rebuild invalidates cached results.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+        for file_path in files:
+            stat = os.stat(file_path)
+            digest.update(f"{file_path}\t{stat.st_size}\t{stat.st_mtime_ns}\n".encode("utf-8"))
+
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of ranked results stored in SQLite.
+
+    Entries are keyed by a hash of (system, index fingerprint, search params,
+    query id, query text), so a rebuilt index or changed parameter never
+    returns stale results. When the stored bytes exceed the budget, the
+    least recently read entries are deleted on close (never mid-run, so
+    entries found at the start of a run stay readable until it finishes).
+    """
+
+    def __init__(self, budget_mb: int = RESULT_CACHE_MB, path: str = RESULT_CACHE_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        self.pending = 0
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def make_key(system: str, fingerprint: str, params: Dict, query_id: str, query_text: str) -> str:
+        """Hash everything that determines a query's results."""
+        payload = json.dumps([system, fingerprint, params, query_id, query_text], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def contains(self, keys: List[str]) -> set:
+        """Return the subset of keys present in the cache (without reading values)."""
+        found: set = set()
+        for start in range(0, len(keys), 500): # stay under SQLite's bound-parameter limit
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.connection.execute(f"SELECT key FROM results WHERE key IN ({placeholders})", batch)
+            found.update(key for key, in rows)
+
+        return found
+
+    def get(self, key: str) -> RankedResults | None:
+        """Return cached results for key (refreshing its recency), or None."""
+        row = self.connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        self._written()
+        return [tuple(item) for item in json.loads(row[0])]
+
+    def put(self, key: str, ranked: RankedResults) -> None:
+        """Store results for key."""
+        value = json.dumps(ranked)
+        previous = self.connection.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        if previous is not None: self.bytes -= previous[0]
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, len(value), time.time()),
+        )
+        self.bytes += len(value)
+        self._written()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters and current footprint."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes": self.bytes,
+        }
+
+    def close(self) -> None:
+        """Evict down to budget, commit and close the connection."""
+        self._evict()
+        self.connection.commit()
+        self.connection.close()
+
+    def _written(self) -> None:
+        self.pending += 1
+        if self.pending < COMMIT_EVERY: return
+
+        self.connection.commit()
+        self.pending = 0
+
+    def _evict(self) -> None:
+        while self.bytes > self.budget_bytes:
+            victims = self.connection.execute(
+                "SELECT key, size FROM results ORDER BY accessed LIMIT ?", (COMMIT_EVERY,)
+            ).fetchall()
+            if not victims: return
+
+            for key, size in victims:
+                if self.bytes <= self.budget_bytes: break
+                self.connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.bytes -= size
+                self.evictions += 1
+
+def iter_cached(
+    name: str,
+    fingerprint: str,
+    params: Dict,
+    queries: List[Tuple[str, str]],
+    compute: Callable[[List[Tuple[str, str]]], Iterator[QueryResult]],
+    budget_mb: int = RESULT_CACHE_MB,
+) -> Iterator[QueryResult]:
+    """
+    Yield results in input order, reading hits from the result cache and computing only the misses.
+
+    Args:
+        name: System name (part of the cache key, and the log prefix).
+        fingerprint: Index fingerprint (see fingerprint_paths).
+        params: Search parameters that change results (top_k, efSearch, mode, ...).
+        queries: List of (query_id, query_text) pairs.
+        compute: Searches a list of queries, yielding results in input order
+            (queries it cannot answer may be skipped).
+        budget_mb: On-disk budget for the cache.
+    """
+    cache = ResultCache(budget_mb)
+    try:
+        keys = [ResultCache.make_key(name, fingerprint, params, query_id, text) for query_id, text in queries]
+        present = cache.contains(keys)
+        misses = [query for query, key in zip(queries, keys) if key not in present]
+        cache.misses += len(misses)
+
+        computed = iter(compute(misses)) if misses else iter(())
+        pending = next(computed, None)
+
+        for (query_id, _), key in zip(queries, keys):
+            ranked = cache.get(key) if key in present else None
+            if ranked is not None:
+                yield query_id, ranked
+                continue
+
+            # compute yields a subsequence of the misses, in order
+            if pending is not None and pending[0] == query_id:
+                cache.put(key, pending[1])
+                yield pending
+                pending = next(computed, None)
+    finally:
+        cache.close()
+        stats = cache.stats()
+        print(
+            f"[{name}] Result cache: hit_rate={stats['hit_rate']:.2%}, hits={stats['hits']}, "
+            f"misses={stats['misses']}, evictions={stats['evictions']}, stored={stats['bytes'] / (1024 ** 2):.2f}MB"
+        )
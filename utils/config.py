@@ -25,4 +25,26 @@ QRELS_EVAL2_PATH: str = f"{QRELS_DIR}/qrels.eval.two.tsv"
 RUNS_BM25_DIR: str = f"{RUNS_DIR}/bm25"
 RUNS_HNSW_DIR: str = f"{RUNS_DIR}/hnsw"
 RUNS_RERANK_RRF_DIR: str = f"{RUNS_DIR}/rerank-rrf"
-RUNS_RERANK_LCF_DIR: str = f"{RUNS_DIR}/rerank-lsf"
\ No newline at end of file
+RUNS_RERANK_LCF_DIR: str = f"{RUNS_DIR}/rerank-lsf"
+
+# Benchmarks
+BENCHMARKS_DIR: str = f"{RUNS_DIR}/benchmarks"
+HNSW_SWEEP_DIR: str = f"{ARTIFACTS_DIR}/hnsw-sweep"
+
+# Result cache
+RESULT_CACHE_PATH: str = f"{ARTIFACTS_DIR}/cache/results.sqlite"
+
+# HDF5 id -> row indexes
+ID_INDEX_DIR: str = f"{ARTIFACTS_DIR}/cache"
+
+# Parsed qrels (pickled, keyed by qrels file name, size and mtime)
+QRELS_CACHE_DIR: str = f"{ARTIFACTS_DIR}/cache"
+
+# Evaluations
+EVALUATIONS_DIR: str = f"{RUNS_DIR}/evaluations"
+
+# Build manifests
+HASH_CACHE_PATH: str = f"{ARTIFACTS_DIR}/cache/hashes.json"
+
+# Profiles
+PROFILES_DIR: str = f"{ARTIFACTS_DIR}/profiles"
\ No newline at end of file
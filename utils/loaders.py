@@ -2,11 +2,21 @@
 Utility functions for loading MSMARCO input files (queries, qrels, runs, etc.).
 """
 
+from __future__ import annotations
+
+import os
+import pickle
 from collections import defaultdict
-from typing import Dict, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
+
+# numpy and h5py are imported inside the functions that need them, so text-only
+# entry points (fusion over TSV runs, evaluation) start without loading them
+if TYPE_CHECKING:
+    import numpy as np
+
+from utils.config import ID_INDEX_DIR, QRELS_CACHE_DIR
 
-import h5py
-import numpy as np
+H5_READ_CHUNK_SIZE: int = 1024  # Rows per HDF5 read when gathering selected embeddings
 
 def load_queries(file_path: str) -> Dict[str, str]:
     """
@@ -44,10 +54,105 @@ def load_qrels(file_path: str) -> Dict[str, Dict[str, int]]:
 
     return dict(qrels)
 
+def load_qrels_cached(file_path: str, cache_path: str | None = None) -> Dict[str, Dict[str, int]]:
+    """
+    Load qrels like load_qrels, reusing a pickled copy after the first parse.
+
+    The copy is stored under artifacts/cache/ (so read-only data directories work),
+    named after the qrels file's name, size and mtime, so an edited file gets a new
+    copy. It is written to a temporary file and renamed, so parallel evaluations
+    never read a partial copy; if it cannot be written, the parsed qrels are
+    only returned.
+
+    Args:
+    - cache_path: Copy location (defaults to `artifacts/cache/<file name>.<size>.<mtime_ns>.pkl`).
+    """
+    if cache_path is None:
+        stat = os.stat(file_path)
+        cache_path = os.path.join(QRELS_CACHE_DIR, f"{os.path.basename(file_path)}.{stat.st_size}.{stat.st_mtime_ns}.pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as cache_file:
+                return pickle.load(cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass # unreadable or damaged copy: parse again
+
+    qrels = load_qrels(file_path)
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(temp_path, "wb") as cache_file:
+            pickle.dump(qrels, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as error:
+        print(f"[Loaders] Could not save qrels cache to {cache_path} ({error}); using the parsed qrels only")
+        if os.path.exists(temp_path): os.remove(temp_path)
+
+    return qrels
+
+def is_binary_run(file_path: str) -> bool:
+    """Binary columnar runs (see utils.writers.RunWriter) use the .npz extension."""
+    return file_path.endswith(".npz")
+
+def load_run_arrays(file_path: str) -> Dict[str, np.ndarray]:
+    """
+    Load run file (TSV or binary .npz) into its columns in one pass:
+    query_ids, offsets, doc_ids (int64), scores (float32), ranks (int32).
+    Query i owns rows offsets[i]:offsets[i + 1].
+    """
+    import numpy as np
+
+    if is_binary_run(file_path):
+        with np.load(file_path) as run:
+            return {key: run[key] for key in run.files}
+
+    query_ids: List[str] = []
+    lengths: List[int] = []
+    doc_ids: List[str] = []
+    ranks: List[str] = []
+    scores: List[str] = []
+    with open(file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip(): continue
+
+            query_id, doc_id, rank, score = line.strip().split("\t")
+            # Runs are written grouped by query, so a new query starts a new block
+            if not query_ids or query_ids[-1] != query_id:
+                query_ids.append(query_id)
+                lengths.append(0)
+            lengths[-1] += 1
+            doc_ids.append(doc_id)
+            ranks.append(rank)
+            scores.append(score)
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return {
+        "query_ids": np.asarray(query_ids, dtype=str),
+        "offsets": offsets,
+        "doc_ids": np.asarray(doc_ids, dtype=np.int64),
+        "scores": np.asarray(scores, dtype=np.float32),
+        "ranks": np.asarray(ranks, dtype=np.int32),
+    }
+
+def _load_binary_run_column(file_path: str, column: str) -> Dict[str, Dict[str, float | int]]:
+    """Load one column ("scores" or "ranks") of a binary run into {query_id: {doc_id: value}}."""
+    arrays = load_run_arrays(file_path)
+    doc_ids: List[str] = arrays["doc_ids"].astype(str).tolist()
+    values: List = arrays[column].tolist()
+    offsets: List[int] = arrays["offsets"].tolist()
+
+    return {
+        query_id: dict(zip(doc_ids[offsets[i]:offsets[i + 1]], values[offsets[i]:offsets[i + 1]]))
+        for i, query_id in enumerate(arrays["query_ids"].tolist())
+    }
+
 def load_run(file_path: str) -> Dict[str, Dict[str, float]]:
     """
-    Load run file into {query_id: {doc_id: score}}.
+    Load run file (TSV or binary .npz) into {query_id: {doc_id: score}}.
     """
+    if is_binary_run(file_path): return _load_binary_run_column(file_path, "scores")
+
     run: Dict[str, Dict[str, float]] = defaultdict(dict)
     with open(file_path, "r", encoding="utf-8") as file:
         for line in file:
@@ -58,12 +163,12 @@ def load_run(file_path: str) -> Dict[str, Dict[str, float]]:
 
     return dict(run)
 
-# TODO: Refactor needed components to use load_run and avoid duplication
-
 def load_ranked_run(file_path: str) -> Dict[str, Dict[str, int]]:
     """
-    Load run file into {query_id: {doc_id: rank}}.
+    Load run file (TSV or binary .npz) into {query_id: {doc_id: rank}}.
     """
+    if is_binary_run(file_path): return _load_binary_run_column(file_path, "ranks")
+
     run: Dict[str, Dict[str, int]] = defaultdict(dict)
     with open(file_path, "r", encoding="utf-8") as file:
         for line in file:
@@ -86,8 +191,148 @@ def load_h5_embeddings(file_path: str, id_key: str = 'id', embedding_key: str =
     - ids: Numpy array of IDs (as strings).
     - embeddings: Numpy array of embeddings (as float32).
     """
+    import h5py
+    import numpy as np
+
     with h5py.File(file_path, 'r') as file:
         ids: np.ndarray = np.array(file[id_key]).astype(str)
         embeddings: np.ndarray = np.array(file[embedding_key]).astype(np.float32)  
 
-    return ids, embeddings
\ No newline at end of file
+    return ids, embeddings
+
+def load_h5_id_index(file_path: str, id_key: str = 'id', index_path: str | None = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load the id -> row index of an HDF5 file, building and persisting it on first use.
+
+    The index is stored as a `.npz` (sorted IDs and their row numbers) under
+    artifacts/cache/, so read-only data directories work, and rebuilt whenever
+    the HDF5 file is newer than it. It is written to a temporary file and
+    renamed, so concurrent processes never read a partial index; if it cannot
+    be written, the index is only kept in memory.
+
+    Args:
+    - id_key: Dataset name for the IDs inside the HDF5 file.
+    - index_path: Index location (defaults to `artifacts/cache/<file name>.ids.npz`).
+
+    Returns:
+    - sorted_ids: Numpy array of IDs (as strings), sorted for binary search.
+    - rows: Row number of each sorted ID inside the HDF5 file.
+    """
+    import h5py
+    import numpy as np
+
+    index_path = index_path or os.path.join(ID_INDEX_DIR, f"{os.path.basename(file_path)}.ids.npz")
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(file_path):
+        with np.load(index_path) as index:
+            return index["ids"], index["rows"]
+
+    with h5py.File(file_path, 'r') as file:
+        ids: np.ndarray = np.array(file[id_key]).astype(str)
+
+    rows: np.ndarray = np.argsort(ids, kind="stable")
+    sorted_ids: np.ndarray = ids[rows]
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        with open(temp_path, "wb") as index_file:
+            np.savez(index_file, ids=sorted_ids, rows=rows)
+        os.replace(temp_path, index_path)
+    except OSError as error:
+        print(f"[Loaders] Could not save id index to {index_path} ({error}); keeping it in memory only")
+        if os.path.exists(temp_path): os.remove(temp_path)
+
+    return sorted_ids, rows
+
+def load_h5_embeddings_by_id(
+    file_path: str,
+    ids: Iterable[str],
+    id_key: str = 'id',
+    embedding_key: str = 'embedding',
+    index_path: str | None = None,
+    id_index: Tuple[np.ndarray, np.ndarray] | None = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load embeddings for the requested IDs only, reading just their rows from the HDF5 file.
+
+    Args:
+    - ids: IDs to load (IDs missing from the file are skipped).
+    - id_key: Dataset name for the IDs inside the HDF5 file.
+    - embedding_key: Dataset name for the embeddings inside the HDF5 file.
+    - index_path: Sidecar location for the id -> row index (see load_h5_id_index).
+    - id_index: Already loaded (sorted_ids, rows) index, for callers reading many batches.
+
+    Returns:
+    - ids: Numpy array of found IDs (as strings), in request order.
+    - embeddings: Numpy array of their embeddings (as float32).
+    """
+    import h5py
+    import numpy as np
+
+    sorted_ids, rows = id_index or load_h5_id_index(file_path, id_key=id_key, index_path=index_path)
+    requested: np.ndarray = np.asarray(list(ids), dtype=str)
+
+    # Binary search each requested ID in the sorted index
+    positions = np.minimum(np.searchsorted(sorted_ids, requested), max(len(sorted_ids) - 1, 0))
+    found = sorted_ids[positions] == requested if len(sorted_ids) else np.zeros(len(requested), dtype=bool)
+    found_ids: np.ndarray = requested[found]
+
+    # HDF5 point selection needs increasing, unique row numbers
+    unique_rows, inverse = np.unique(rows[positions[found]], return_inverse=True)
+
+    with h5py.File(file_path, 'r') as file:
+        dataset = file[embedding_key]
+        embeddings: np.ndarray = np.empty((len(unique_rows), dataset.shape[1]), dtype=np.float32)
+        for start in range(0, len(unique_rows), H5_READ_CHUNK_SIZE):
+            end = min(start + H5_READ_CHUNK_SIZE, len(unique_rows))
+            embeddings[start:end] = dataset[unique_rows[start:end]]
+
+    return found_ids, embeddings[inverse]
+
+def load_h5_shape(file_path: str, embedding_key: str = 'embedding') -> Tuple[int, int]:
+    """
+    Return (num_rows, dim) of the embeddings dataset without reading it.
+    """
+    import h5py
+
+    with h5py.File(file_path, 'r') as file:
+        num_rows, dim = file[embedding_key].shape
+
+    return num_rows, dim
+
+def iter_h5_embeddings(
+    file_path: str,
+    chunk_size: int,
+    id_key: str = 'id',
+    embedding_key: str = 'embedding',
+    start: int = 0,
+    stop: int | None = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Stream IDs and embeddings from an HDF5 file one chunk at a time.
+
+    Only the current chunk is held in memory, so callers can process
+    collections larger than RAM.
+
+    Args:
+    - chunk_size: Rows read per chunk.
+    - id_key: Dataset name for the IDs inside the HDF5 file.
+    - embedding_key: Dataset name for the embeddings inside the HDF5 file.
+    - start, stop: Row range to stream (defaults to the whole file).
+
+    Yields:
+    - ids: Numpy array of chunk IDs (as strings).
+    - embeddings: Numpy array of chunk embeddings (as float32).
+    """
+    import h5py
+    import numpy as np
+
+    with h5py.File(file_path, 'r') as file:
+        id_dataset, embedding_dataset = file[id_key], file[embedding_key]
+        stop = len(embedding_dataset) if stop is None else min(stop, len(embedding_dataset))
+
+        for chunk_start in range(start, stop, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, stop)
+            ids: np.ndarray = id_dataset[chunk_start:chunk_end].astype(str)
+            embeddings: np.ndarray = np.empty((chunk_end - chunk_start, embedding_dataset.shape[1]), dtype=np.float32)
+            embedding_dataset.read_direct(embeddings, np.s_[chunk_start:chunk_end])
+            yield ids, embeddings
@@ -0,0 +1,148 @@
+"""
+Build manifests: input fingerprints, build parameters and an artifact fingerprint
+recorded next to each built index, so unchanged builds are skipped and stale
+indexes are refused at load time.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+
+from utils.cache import fingerprint_paths
+from utils.config import HASH_CACHE_PATH
+
+MANIFEST_NAME: str = "manifest.json"    # Written inside each artifact directory
+HASH_BLOCK_SIZE: int = 8 * 1024 ** 2    # Bytes read at a time when hashing input files
+
+def content_hash(file_path: str) -> str:
+    """
+    sha256 of a file's contents. Hashes are cached by (path, size, mtime) in
+    artifacts/cache/hashes.json, so each version of a large input is read once.
+    """
+    stat = os.stat(file_path)
+    key = os.path.abspath(file_path)
+    hashes: Dict[str, Dict] = {}
+    if os.path.exists(HASH_CACHE_PATH):
+        with open(HASH_CACHE_PATH, "r", encoding="utf-8") as hash_file:
+            hashes = json.load(hash_file)
+
+    cached = hashes.get(key)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["sha256"]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as input_file:
+        while block := input_file.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+
+    # Re-read before writing so concurrent builds (e.g. shard workers) lose as few entries as possible
+    if os.path.exists(HASH_CACHE_PATH):
+        with open(HASH_CACHE_PATH, "r", encoding="utf-8") as hash_file:
+            hashes = json.load(hash_file)
+    hashes[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    os.makedirs(os.path.dirname(HASH_CACHE_PATH) or ".", exist_ok=True)
+    temp_path = f"{HASH_CACHE_PATH}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as hash_file:
+        json.dump(hashes, hash_file, indent=2)
+    os.replace(temp_path, HASH_CACHE_PATH)
+
+    return digest.hexdigest()
+
+def fingerprint_input(file_path: str) -> Dict[str, int | str]:
+    """Path, size, modification time and content hash of one input file."""
+    stat = os.stat(file_path)
+    return {"path": file_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": content_hash(file_path)}
+
+def read_manifest(artifact_dir: str) -> Dict | None:
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path): return None
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+def _write(artifact_dir: str, manifest: Dict) -> None:
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def write_manifest(artifact_dir: str, inputs: Dict[str, str], params: Dict, artifact_paths: List[str]) -> None:
+    """
+    Record a finished build.
+
+    Args:
+        artifact_dir: Directory the manifest is written to.
+        inputs: Input role -> file path (e.g. {"embeddings": SUBSET_EMBEDDINGS_PATH}).
+        params: Build parameters that determine the artifacts' contents.
+        artifact_paths: Built files or directories (fingerprinted by size and mtime).
+    """
+    _write(artifact_dir, {
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "inputs": {role: fingerprint_input(path) for role, path in inputs.items()},
+        "params": params,
+        "artifacts": fingerprint_paths(artifact_paths),
+        "ingested": [],
+    })
+
+def record_ingest(artifact_dir: str, entry: Dict, artifact_paths: List[str]) -> None:
+    """Note an incremental update to built artifacts and refresh their fingerprint (no-op without a manifest)."""
+    manifest = read_manifest(artifact_dir)
+    if manifest is None: return
+
+    manifest["ingested"].append({"at": time.strftime("%Y-%m-%dT%H:%M:%S"), **entry})
+    manifest["artifacts"] = fingerprint_paths(artifact_paths)
+    _write(artifact_dir, manifest)
+
+def manifest_problems(artifact_dir: str, inputs: Dict[str, str], params: Dict, artifact_paths: List[str]) -> List[str]:
+    """
+    Compare a manifest with the current inputs, parameters and artifacts.
+
+    Inputs whose size and mtime match the manifest are trusted without hashing;
+    a touched file with unchanged contents still matches.
+
+    Returns:
+        Human-readable differences (empty when the artifacts are current).
+    """
+    manifest = read_manifest(artifact_dir)
+    if manifest is None: return ["no manifest"]
+
+    problems: List[str] = []
+    recorded_params = manifest["params"]
+    current_params = json.loads(json.dumps(params)) # tuples -> lists, as stored
+    for name in sorted(set(recorded_params) | set(current_params)):
+        if recorded_params.get(name) != current_params.get(name):
+            problems.append(f"{name}: built with {recorded_params.get(name)!r}, now {current_params.get(name)!r}")
+
+    for role, path in inputs.items():
+        recorded = manifest["inputs"].get(role)
+        if recorded is None or recorded["path"] != path:
+            problems.append(f"{role}: built from {recorded and recorded['path']}, now {path}")
+        elif not os.path.exists(path):
+            problems.append(f"{role}: {path} is missing")
+        else:
+            stat = os.stat(path)
+            unchanged = stat.st_size == recorded["size"] and stat.st_mtime_ns == recorded["mtime_ns"]
+            if not unchanged and (stat.st_size != recorded["size"] or content_hash(path) != recorded["sha256"]):
+                problems.append(f"{role}: {path} changed since the build")
+
+    if fingerprint_paths(artifact_paths) != manifest["artifacts"]:
+        problems.append("artifacts were modified or removed after the build")
+
+    return problems
+
+def verify_manifest(name: str, artifact_dir: str, inputs: Dict[str, str], params: Dict, artifact_paths: List[str]) -> None:
+    """
+    Refuse to load artifacts that do not match the current inputs and parameters.
+    Artifacts built before manifests existed load with a warning.
+    """
+    problems = manifest_problems(artifact_dir, inputs, params, artifact_paths)
+    if problems == ["no manifest"]:
+        print(f"[{name}] Warning: no {MANIFEST_NAME} in {artifact_dir}; cannot verify the index (rebuild to record one)")
+        return
+
+    if problems:
+        raise ValueError(
+            f"[{name}] Artifacts in {artifact_dir} do not match the current build: {'; '.join(problems)}. "
+            f"Rebuild them with `python -m scripts.build`."
+        )
@@ -1,13 +1,303 @@
 """
 Performance tracker for search systems.
-Use track='time' or 'memory' (default=None for no tracking).
+Use track='time', 'memory', 'rss', 'latency' or 'profile' (default=None for no tracking).
+
+'memory' counts Python allocations only (tracemalloc); 'rss' samples the
+process's resident memory, which includes FAISS, h5py and numpy buffers.
 """
 
+import json
+import os
+import resource
+import sys
+import threading
 import time
 import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+# Latency report parameters
+LATENCY_PERCENTILES: Tuple[int, ...] = (50, 95, 99)    # Percentiles reported per system
+REPORT_SUFFIX: str = ".perf.json"                      # Report written next to each run file
+
+# Memory sampling parameters
+RSS_SAMPLE_SECONDS: float = 0.05    # Interval between RSS samples on the sampler thread
+USS_EVERY: int = 10                 # RSS samples between USS samples (smaps_rollup is slower to read)
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an ascending list (same as numpy's default method)."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def latency_distribution(sorted_seconds: List[float]) -> Dict[str, float]:
+    """Mean, percentiles and max (milliseconds) of an ascending list of latencies in seconds."""
+    return {
+        "mean_ms": sum(sorted_seconds) / len(sorted_seconds) * 1000,
+        **{f"p{q}_ms": percentile(sorted_seconds, q) * 1000 for q in LATENCY_PERCENTILES},
+        "max_ms": sorted_seconds[-1] * 1000,
+    }
+
+def format_distribution(distribution: Dict[str, float]) -> str:
+    percentiles = ", ".join(f"p{q}={distribution[f'p{q}_ms']:.2f}ms" for q in LATENCY_PERCENTILES)
+    return f"{percentiles}, max={distribution['max_ms']:.2f}ms"
+
+class Instrumentation:
+    """
+    Named stage spans and per-query latency samples for one tracked call.
+
+    Systems report into the active instance through the module-level stage()
+    and record_latency() helpers, which do nothing when no tracking is active.
+    Stage times accumulate across spans with the same name; spans opened
+    concurrently (e.g. hybrid legs on two threads) each count in full.
+    Batched systems record whole batches, reported as a separate batch latency
+    series: spreading a batch's time over its queries would give every query
+    the same latency and hide the tail.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}    # name -> {"seconds", "calls"}
+        self.latencies: Dict[str, List[float]] = {}      # system name -> per-query seconds
+        self.batch_latencies: Dict[str, List[Tuple[float, int]]] = {} # system name -> (batch seconds, batch size)
+        self.run_paths: List[str] = []                   # run files written while active
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.wall_seconds: float | None = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self.lock:
+                totals = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                totals["seconds"] += elapsed
+                totals["calls"] += 1
+
+    def record_latency(self, system: str, seconds: float, count: int | None = None) -> None:
+        """Record one query timed alone (count=None) or a batch of `count` queries answered together in `seconds`."""
+        with self.lock:
+            if count is None: self.latencies.setdefault(system, []).append(seconds)
+            elif count > 0: self.batch_latencies.setdefault(system, []).append((seconds, count))
+
+    def finish(self) -> None:
+        self.wall_seconds = time.perf_counter() - self.start_time
+
+    def report(self) -> Dict:
+        """
+        Stage totals and per-system latency distributions (milliseconds) with QPS.
+
+        `qps` is end-to-end (wall time, including loading and saving); `search_qps`
+        counts only the recorded search time. Per-query percentiles cover queries
+        timed one at a time, and batched searches are summarized under "batches".
+        """
+        wall_seconds = self.wall_seconds if self.wall_seconds is not None else time.perf_counter() - self.start_time
+        systems = {}
+        for system in dict.fromkeys([*self.latencies, *self.batch_latencies]):
+            samples = sorted(self.latencies.get(system, []))
+            batches = self.batch_latencies.get(system, [])
+            num_queries = len(samples) + sum(size for _, size in batches)
+            search_seconds = sum(samples) + sum(seconds for seconds, _ in batches)
+
+            latency = {"queries": num_queries}
+            if samples: latency.update(latency_distribution(samples))
+            if batches:
+                latency["batches"] = {
+                    "count": len(batches),
+                    "mean_size": sum(size for _, size in batches) / len(batches),
+                    **latency_distribution(sorted(seconds for seconds, _ in batches)),
+                }
+            latency.update({
+                "search_seconds": search_seconds,
+                "search_qps": num_queries / max(search_seconds, 1e-9),
+                "qps": num_queries / max(wall_seconds, 1e-9),
+            })
+            systems[system] = latency
+
+        return {
+            "wall_seconds": wall_seconds,
+            "stages": {name: dict(totals) for name, totals in self.stages.items()},
+            "latency": systems,
+        }
+
+    def print_summary(self) -> None:
+        report = self.report()
+        print(f"[Performance] Wall time={report['wall_seconds']:.3f}s")
+        for name, totals in report["stages"].items():
+            print(f"[Performance]   {name:<14} {totals['seconds']:>9.3f}s ({totals['calls']} spans)")
+        for system, latency in report["latency"].items():
+            print(
+                f"[Performance] {system}: {latency['queries']} queries, "
+                f"QPS={latency['qps']:.1f} (search only {latency['search_qps']:.1f})"
+            )
+            if "max_ms" in latency:
+                print(f"[Performance]   per query: {format_distribution(latency)}")
+            if "batches" in latency:
+                batches = latency["batches"]
+                print(
+                    f"[Performance]   per batch ({batches['count']} batches, mean size {batches['mean_size']:.1f}): "
+                    f"{format_distribution(batches)}"
+                )
+
+    def write(self, output_path: str) -> None:
+        with open(output_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+    def save(self) -> None:
+        """Write the report to `<run file>.perf.json` for each run file saved while active."""
+        for run_path in self.run_paths:
+            self.write(f"{run_path}{REPORT_SUFFIX}")
+            print(f"[Performance] Report saved to {run_path}{REPORT_SUFFIX}")
+
+class MemoryTracker(Instrumentation):
+    """
+    Instrumentation that also samples process memory on a background thread.
+
+    Resident memory (RSS) covers native allocations that tracemalloc misses
+    (FAISS graphs, h5py buffers, search_system posting lists). Each stage
+    records its peak sampled RSS and net RSS growth; samples taken while
+    several stages are open count toward each of them. Systems report the
+    sizes of their main structures with record_structure().
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.stage_memory: Dict[str, Dict[str, int]] = {}       # name -> {"peak_rss", "rss_growth"}
+        self.structures: Dict[str, Dict[str, int]] = {}         # system -> {structure: bytes}
+        self.open_stages: List[str] = []
+        self.rss_start = get_memory_usage()[0]
+        self.peak_sampled_rss = self.rss_start
+        self.peak_uss = get_unique_memory()
+        self.num_samples = 0
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self.sampler.start()
+
+    def _sample(self) -> None:
+        while not self.stopped.wait(RSS_SAMPLE_SECONDS):
+            rss, _ = get_memory_usage()
+            uss = get_unique_memory() if self.num_samples % USS_EVERY == 0 else None
+            with self.lock:
+                self.num_samples += 1
+                self.peak_sampled_rss = max(self.peak_sampled_rss, rss)
+                if uss is not None: self.peak_uss = max(self.peak_uss or 0, uss)
+                for name in set(self.open_stages):
+                    self.stage_memory[name]["peak_rss"] = max(self.stage_memory[name]["peak_rss"], rss)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        rss_start, _ = get_memory_usage()
+        with self.lock:
+            memory = self.stage_memory.setdefault(name, {"peak_rss": 0, "rss_growth": 0})
+            memory["peak_rss"] = max(memory["peak_rss"], rss_start)
+            self.open_stages.append(name)
+        try:
+            with super().stage(name):
+                yield
+        finally:
+            rss_end, _ = get_memory_usage()
+            with self.lock:
+                self.open_stages.remove(name)
+                memory["peak_rss"] = max(memory["peak_rss"], rss_end)
+                memory["rss_growth"] += rss_end - rss_start
+
+    def record_structure(self, system: str, structure: str, num_bytes: int) -> None:
+        with self.lock:
+            self.structures.setdefault(system, {})[structure] = int(num_bytes)
+
+    def finish(self) -> None:
+        self.stopped.set()
+        self.sampler.join()
+        super().finish()
+
+    def report(self) -> Dict:
+        report = super().report()
+        rss, peak_rss = get_memory_usage()
+        for name, memory in self.stage_memory.items():
+            report["stages"][name].update(memory)
+        report["memory"] = {
+            "rss_start": self.rss_start,
+            "rss_end": rss,
+            "peak_rss": max(peak_rss, self.peak_sampled_rss), # kernel high-water mark (catches spikes between samples)
+            "peak_sampled_rss": self.peak_sampled_rss,
+            "peak_uss": self.peak_uss,
+            "samples": self.num_samples,
+            "structures": self.structures,
+        }
+        return report
 
-def track_performance(func, *args, track: str | None = None, **kwargs):
-    """Track runtime or peak memory usage for any callable."""
+    def print_summary(self) -> None:
+        super().print_summary()
+        memory = self.report()["memory"]
+        uss = format_bytes(memory["peak_uss"]) if memory["peak_uss"] is not None else "n/a"
+        print(
+            f"[Performance] RSS start={format_bytes(memory['rss_start'])}, end={format_bytes(memory['rss_end'])}, "
+            f"peak={format_bytes(memory['peak_rss'])}, peak USS={uss} ({memory['samples']} samples)"
+        )
+        for name, stage_memory in self.stage_memory.items():
+            print(
+                f"[Performance]   {name:<14} peak RSS={format_bytes(stage_memory['peak_rss'])}, "
+                f"growth={format_bytes(stage_memory['rss_growth'])}"
+            )
+        for system, structures in self.structures.items():
+            sizes = ", ".join(f"{structure}={format_bytes(num_bytes)}" for structure, num_bytes in structures.items())
+            print(f"[Performance] {system} structures: {sizes}")
+
+# Instrumentation of the call currently tracked with track="latency" (None = not tracking)
+_ACTIVE: Instrumentation | None = None
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a named stage (load index, load queries, search, fuse, save) if latency tracking is active."""
+    active = _ACTIVE
+    if active is None:
+        yield
+        return
+    with active.stage(name):
+        yield
+
+def record_latency(system: str, seconds: float, count: int | None = None) -> None:
+    """Record per-query or per-batch search latency if latency tracking is active (see Instrumentation.record_latency)."""
+    if _ACTIVE is not None: _ACTIVE.record_latency(system, seconds, count)
+
+def record_structure(system: str, structure: str, num_bytes: int) -> None:
+    """Report the size of an in-memory structure (HNSW graph, vector storage, list cache) if RSS tracking is active."""
+    if isinstance(_ACTIVE, MemoryTracker): _ACTIVE.record_structure(system, structure, num_bytes)
+
+def record_run_path(output_path: str) -> None:
+    """Note a written run file so the latency report is saved next to it."""
+    if _ACTIVE is not None: _ACTIVE.run_paths.append(output_path)
+
+def track_latency(func, *args, **kwargs):
+    """
+    Run func with stage and per-query latency instrumentation, print a summary,
+    and write the JSON report to `<run file>.perf.json` for each run file it saved.
+    """
+    return track_instrumented(Instrumentation(), func, *args, **kwargs)
+
+def track_rss(func, *args, **kwargs):
+    """Like track_latency, with RSS/USS sampling per stage and per-structure sizes (see MemoryTracker)."""
+    return track_instrumented(MemoryTracker(), func, *args, **kwargs)
+
+def track_instrumented(instrumentation: Instrumentation, func, *args, **kwargs):
+    """Make `instrumentation` the active one while func runs, then print and save its report."""
+    global _ACTIVE
+    _ACTIVE = instrumentation
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        _ACTIVE = None
+        instrumentation.finish()
+
+    instrumentation.print_summary()
+    instrumentation.save()
+    return result
+
+def track_performance(func, *args, track: str | None = None, label: str | None = None, **kwargs):
+    """Track runtime or peak memory usage for any callable (label names the profile output directory)."""
     if track is None: return func(*args, **kwargs)
 
     if track == "time":
@@ -23,4 +313,91 @@ def track_performance(func, *args, track: str | None = None, **kwargs):
         current, peak = tracemalloc.get_traced_memory()
         tracemalloc.stop()
         print(f"[Performance] Peak Memory={peak / (1024 ** 2):.2f}MB")
-        return result
\ No newline at end of file
+        return result
+
+    if track == "rss":
+        return track_rss(func, *args, **kwargs)
+
+    if track == "latency":
+        return track_latency(func, *args, **kwargs)
+
+    if track == "profile":
+        from utils.profiling import track_profile # cProfile/pstats are only needed when profiling
+        return track_profile(func, *args, label=label, **kwargs)
+
+def get_memory_usage() -> Tuple[int, int]:
+    """
+    Return (current RSS, peak RSS) of this process in bytes.
+
+    Unlike tracemalloc, RSS includes native allocations (FAISS, h5py, numpy).
+    """
+    rss, peak = 0, 0
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmRSS:"): rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"): peak = int(line.split()[1]) * 1024
+    except OSError:
+        # Non-Linux fallback: ru_maxrss is KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss = peak
+
+    return rss, peak
+
+def get_unique_memory() -> int | None:
+    """
+    USS of this process in bytes: private pages only, i.e. the memory freed if
+    it exited (Linux 4.14+ smaps_rollup; None where unavailable).
+    """
+    try:
+        uss = 0
+        with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as rollup:
+            for line in rollup:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")): uss += int(line.split()[1]) * 1024
+        return uss
+    except OSError:
+        return None
+
+def format_bytes(num_bytes: float) -> str:
+    return f"{num_bytes / (1024 ** 2):.2f}MB"
+
+def get_process_age() -> float | None:
+    """Seconds since this process started (Linux /proc only; None elsewhere)."""
+    try:
+        with open("/proc/uptime", "r", encoding="utf-8") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        with open("/proc/self/stat", "r", encoding="utf-8") as stat_file:
+            start_ticks = int(stat_file.read().rsplit(")", 1)[1].split()[19]) # field 22: starttime
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+
+class StartupProfile:
+    """Times entry point startup: interpreter and script imports, then each marked stage."""
+
+    # Heavy dependencies worth reporting when a stage pulls them in
+    HEAVY_MODULES: Tuple[str, ...] = ("numpy", "h5py", "faiss", "search_system", "pytrec_eval", "tqdm")
+
+    def __init__(self) -> None:
+        self.stages: List[Tuple[str, float]] = []
+        age = get_process_age()
+        if age is not None: self.stages.append(("interpreter + imports", age))
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        """Close the stage that started at the previous mark."""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def report(self) -> None:
+        """Print stage times and which heavy dependencies were imported."""
+        print("[Startup] Stage times:")
+        for stage, seconds in self.stages:
+            print(f"[Startup]   {stage:<24} {seconds * 1000:>9.1f}ms")
+        print(f"[Startup]   {'total':<24} {sum(seconds for _, seconds in self.stages) * 1000:>9.1f}ms")
+
+        loaded = [name for name in self.HEAVY_MODULES if name in sys.modules]
+        print(f"[Startup] Heavy modules loaded: {', '.join(loaded) or 'none'}")
+        print("[Startup] Per-module import times: python -X importtime -m <script> ...")
@@ -0,0 +1,163 @@
+"""
+Per-stage profiling: each instrumented stage (load index, search, fuse, save, ...)
+runs under its own cProfile profiler, exported as pstats and collapsed stacks.
+"""
+
+import cProfile
+import os
+import pstats
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from utils.performance import Instrumentation, track_instrumented
+from utils.config import PROFILES_DIR
+
+# Profile report parameters
+TOP_FUNCTIONS: int = 10             # Hot functions printed per stage
+MIN_STACK_SECONDS: float = 1e-6     # Stack paths below this share of time are not expanded
+MAX_STACK_DEPTH: int = 256          # Deepest call path written to collapsed stacks
+
+# Types
+Function = Tuple[str, int, str] # (file, line, name), as keyed by pstats
+
+def function_label(func: Function) -> str:
+    """Readable frame name for summaries and collapsed stacks (no ';', which separates frames)."""
+    file_name, line, name = func
+    if file_name == "~": return name.replace(";", ",") # built-in
+    return f"{name} ({os.path.basename(file_name)}:{line})".replace(";", ",")
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, float]:
+    """
+    Approximate `frame;frame;...` -> self seconds from a cProfile call graph.
+
+    cProfile records caller -> callee edges rather than full stacks, so paths
+    are rebuilt from the profile's roots (functions whose time is not covered
+    by recorded callers) and each callee's time is split across its callers
+    in proportion to the cumulative time of each edge.
+    """
+    entries = stats.stats
+    callees: Dict[Function, Dict[Function, float]] = defaultdict(dict)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3] # cumulative time spent in func when called from caller
+
+    stacks: Dict[str, float] = defaultdict(float)
+    on_path: set = set()
+
+    def walk(func: Function, path: List[str], share: float) -> None:
+        _, _, self_seconds, cumulative_seconds, _ = entries[func]
+        if cumulative_seconds * share < MIN_STACK_SECONDS or len(path) >= MAX_STACK_DEPTH: return
+
+        path.append(function_label(func))
+        on_path.add(func)
+        stacks[";".join(path)] += self_seconds * share
+        for callee, edge_seconds in callees[func].items():
+            callee_seconds = entries[callee][3]
+            if callee in on_path or callee_seconds <= 0: continue # recursion is folded into the outer frame
+            walk(callee, path, share * edge_seconds / callee_seconds)
+        on_path.discard(func)
+        path.pop()
+
+    # Roots: time not explained by recorded callers (frames entered before the profiler was enabled)
+    for func, (_, _, _, cumulative_seconds, callers) in entries.items():
+        if cumulative_seconds <= 0: continue
+        called_seconds = sum(edge[3] for caller, edge in callers.items() if caller != func)
+        root_share = max(cumulative_seconds - called_seconds, 0.0) / cumulative_seconds
+        if root_share > 0: walk(func, [], root_share)
+
+    return stacks
+
+class StageProfiler(Instrumentation):
+    """
+    Instrumentation that profiles every stage with cProfile.
+
+    Each (stage, thread) gets its own profiler, merged per stage on export.
+    A stage opened inside another on the same thread stays in the outer
+    stage's profile, and a stage that cannot enable a profiler (Python 3.12+
+    allows one active profiler per process) is timed but not profiled.
+    Work in worker processes (BM25 --workers, shard builds) is not profiled.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        super().__init__()
+        self.output_dir = output_dir
+        self.profiles: Dict[Tuple[str, int], cProfile.Profile] = {}
+        self.profiling = threading.local() # stage this thread is currently profiling
+        self.stats: Dict[str, pstats.Stats] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        profile = None
+        if getattr(self.profiling, "stage", None) is None:
+            with self.lock:
+                profile = self.profiles.setdefault((name, threading.get_ident()), cProfile.Profile())
+            try:
+                profile.enable()
+                self.profiling.stage = name
+            except ValueError:
+                profile = None # another thread's profiler is active
+
+        try:
+            with super().stage(name):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.profiling.stage = None
+
+    def stage_stats(self) -> Dict[str, pstats.Stats]:
+        """Merged statistics per stage (stages whose spans were never profiled are omitted)."""
+        merged: Dict[str, pstats.Stats] = {}
+        for (name, _), profile in self.profiles.items():
+            profile.create_stats()
+            if not profile.stats: continue
+            if name in merged: merged[name].add(profile)
+            else: merged[name] = pstats.Stats(profile)
+
+        return merged
+
+    def finish(self) -> None:
+        super().finish()
+        self.stats = self.stage_stats()
+
+    def print_summary(self) -> None:
+        super().print_summary()
+
+        for name, stats in self.stats.items():
+            # Hottest functions by time spent in the function itself
+            hot = sorted(stats.stats.items(), key=lambda entry: entry[1][2], reverse=True)[:TOP_FUNCTIONS]
+            print(f"[Profile] {name}: {stats.total_tt:.3f}s profiled, top {len(hot)} functions by self time:")
+            for func, (_, num_calls, self_seconds, cumulative_seconds, _) in hot:
+                print(
+                    f"[Profile]   {self_seconds:>9.3f}s self {cumulative_seconds:>9.3f}s cum "
+                    f"{num_calls:>10} calls  {function_label(func)}"
+                )
+
+    def save(self) -> None:
+        """Write `<stage>.pstats` and `<stage>.collapsed` (flamegraph.pl / speedscope input) per stage."""
+        super().save()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        for name, stats in self.stats.items():
+            slug = name.replace(" ", "_")
+            stats.dump_stats(os.path.join(self.output_dir, f"{slug}.pstats"))
+            with open(os.path.join(self.output_dir, f"{slug}.collapsed"), "w", encoding="utf-8") as collapsed_file:
+                for stack, seconds in sorted(collapsed_stacks(stats).items()):
+                    microseconds = int(seconds * 1e6)
+                    if microseconds > 0: collapsed_file.write(f"{stack} {microseconds}\n")
+
+        print(f"[Profile] Saved <stage>.pstats and <stage>.collapsed files to {self.output_dir}")
+
+def track_profile(func, *args, label: str | None = None, **kwargs):
+    """
+    Run func with every stage profiled; outputs go to artifacts/profiles/<timestamp>-<label>-<suffix>/.
+    The random suffix keeps profiles started in the same second (several systems in one run) apart.
+    """
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    prefix = "-".join(part for part in (time.strftime("%Y%m%d-%H%M%S"), label) if part).replace(os.sep, "_")
+    output_dir = tempfile.mkdtemp(prefix=f"{prefix}-", dir=PROFILES_DIR)
+    return track_instrumented(StageProfiler(output_dir), func, *args, **kwargs)
@@ -0,0 +1,124 @@
+"""
+Utility functions for writing run files (TSV or binary columnar .npz).
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, List, Tuple
+
+from tqdm import tqdm
+
+from utils.loaders import is_binary_run
+from utils.performance import record_run_path, stage
+
+# numpy is only needed for binary runs, so it is imported where those are written
+if TYPE_CHECKING:
+    import numpy as np
+
+# Streaming write parameters
+WRITE_BUFFER_BYTES: int = 1 << 20   # File buffer for TSV runs
+FLUSH_EVERY: int = 1000             # Queries between explicit flushes (bounds loss on a crash)
+
+# Types
+RankedResults = List[Tuple[int | str, float]]
+QueryResult = Tuple[str, RankedResults] # (query_id, [(doc_id, score), ...])
+
+class RunWriter:
+    """
+    Append ranked results to a run file as each query completes.
+
+    TSV runs are written through a buffered file and flushed every
+    `flush_every` queries, so a crash loses at most that many queries.
+    Binary (.npz) runs accumulate compact per-query arrays and are written
+    on close, since the format needs the final offsets.
+    """
+
+    def __init__(self, output_path: str, flush_every: int = FLUSH_EVERY) -> None:
+        self.output_path = output_path
+        self.flush_every = flush_every
+        self.binary = is_binary_run(output_path)
+        self.num_queries = 0
+
+        if self.binary:
+            self.query_ids: List[str] = []
+            self.lengths: List[int] = []
+            self.doc_id_chunks: List[np.ndarray] = []
+            self.score_chunks: List[np.ndarray] = []
+        else:
+            self.file = open(output_path, "w", encoding="utf-8", buffering=WRITE_BUFFER_BYTES)
+
+    def __enter__(self) -> "RunWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, query_id: str, ranked_docs: RankedResults) -> None:
+        """Append one query's ranked results."""
+        self.num_queries += 1
+
+        if self.binary:
+            import numpy as np
+
+            self.query_ids.append(query_id)
+            self.lengths.append(len(ranked_docs))
+            if ranked_docs:
+                doc_ids, scores = zip(*ranked_docs)
+                self.doc_id_chunks.append(np.asarray(doc_ids, dtype=np.int64))
+                self.score_chunks.append(np.asarray(scores, dtype=np.float32))
+            return
+
+        # Columns: query_id, doc_id, rank, score
+        self.file.write("".join(
+            f"{query_id}\t{doc_id}\t{rank}\t{score:.6f}\n"
+            for rank, (doc_id, score) in enumerate(ranked_docs, start=1)
+        ))
+        if self.num_queries % self.flush_every == 0: self.file.flush()
+
+    def close(self) -> None:
+        """Flush TSV output, or write the binary run."""
+        if not self.binary:
+            self.file.close()
+            return
+
+        import numpy as np
+
+        offsets = np.zeros(len(self.lengths) + 1, dtype=np.int64)
+        np.cumsum(self.lengths, out=offsets[1:])
+
+        # Rank restarts at 1 for every query
+        ranks = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1], self.lengths) + 1
+
+        with open(self.output_path, "wb") as output_file:
+            np.savez(
+                output_file,
+                query_ids=np.asarray(self.query_ids, dtype=str),
+                offsets=offsets,
+                doc_ids=np.concatenate(self.doc_id_chunks) if self.doc_id_chunks else np.empty(0, dtype=np.int64),
+                scores=np.concatenate(self.score_chunks) if self.score_chunks else np.empty(0, dtype=np.float32),
+                ranks=ranks.astype(np.int32),
+            )
+
+def write_run(results: Iterable[QueryResult], output_path: str, desc: str = "Saving results") -> None:
+    """
+    Write ranked results to output_path, choosing the format from its extension.
+    `results` may be a generator; each query is written as soon as it is produced.
+
+    - `.npz`: binary columnar run with arrays
+      query_ids, offsets (query i owns rows offsets[i]:offsets[i + 1]),
+      doc_ids (int64), scores (float32), ranks (int32, 1-based).
+    - anything else: tab-separated `query_id, doc_id, rank, score` lines.
+    """
+    total = len(results) if hasattr(results, "__len__") else None
+    record_run_path(output_path)
+    writer = RunWriter(output_path)
+    try:
+        with tqdm(total=total, desc=desc, unit="query") as progress:
+            for query_id, ranked_docs in results:
+                # Only the write is timed; with a generator, search time is spent in the loop header
+                with stage("save"):
+                    writer.write(query_id, ranked_docs)
+                progress.update(1)
+    finally:
+        with stage("save"):
+            writer.close()